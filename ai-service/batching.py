@@ -0,0 +1,147 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+from executors import Overloaded
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        # Cumulative counts, Prometheus style: bucket "le" includes everything below it
+        buckets = {}
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            buckets[str(bound)] = running
+        buckets["+Inf"] = self.count
+
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0
+        }
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many requests and hands them to
+    `process_batch` together, once `max_batch_size` items are waiting or
+    the oldest item has waited `max_wait_ms`.
+
+    Batches run on `pool`, one batch per pool worker at a time. When
+    `max_pending` items are already queued, `submit` raises `Overloaded`.
+    `process_batch` may return an exception in place of an item's result
+    to fail that item alone.
+    """
+
+    def __init__(self, name, process_batch, pool, max_batch_size=8, max_wait_ms=20, max_pending=256):
+        self.name = name
+        self.process_batch = process_batch
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 5, 10, 25, 50, 100, 250, 500, 1000])
+        self.batch_latency_ms = Histogram([5, 10, 25, 50, 100, 250, 500, 1000, 2500])
+
+        self._queue = None
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._tasks = [
+                asyncio.create_task(self._run())
+                for _ in range(self.pool.workers)
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def has_capacity(self):
+        return self._queue is not None and not self._queue.full()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise Overloaded(self.name)
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000)
+            self.batch_sizes.observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+
+            try:
+                results = await self.pool.run(self.process_batch, items)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            finally:
+                self.batch_latency_ms.observe((time.perf_counter() - started) * 1000)
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_pending": self.max_pending,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "batch_latency_ms": self.batch_latency_ms.snapshot()
+        }
@@ -0,0 +1 @@
+# Lets tests import the service modules (smoothing, outbox, ...) directly
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+# COCO class index of "cell phone", shared by yolov8n.pt and its ONNX export
+COCO_CELL_PHONE = 67
+
+
+class UltralyticsPhoneDetector:
+    """Stock YOLOv8 through the Ultralytics/PyTorch path."""
+
+    def __init__(self, weights="yolov8n.pt", confidence=0.25):
+        import torch
+        from ultralytics import YOLO
+
+        torch.set_num_threads(1)
+
+        self.model = YOLO(weights)
+        self.confidence = confidence
+        self.class_id = next(
+            i for i, name in self.model.names.items() if name == "cell phone"
+        )
+
+    def detect(self, frames):
+        results = self.model(
+            frames,
+            classes=[self.class_id],
+            conf=self.confidence,
+            verbose=False
+        )
+        return [float(r.boxes.conf.max()) if len(r.boxes) else 0.0 for r in results]
+
+
+class OnnxPhoneDetector:
+    """
+    YOLOv8 exported to ONNX (optionally INT8-quantized), run with ONNX Runtime
+    at a fixed input size. Only the cell phone class score is read from the
+    output, so no NMS is needed to answer "is there a phone, how confident".
+    """
+
+    def __init__(self, model_path="yolov8n.onnx", confidence=0.25, input_size=320):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # One detect worker thread per session, see DETECT_WORKERS
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.confidence = confidence
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Exported with dynamic=True the dims are names, not numbers
+        height = model_input.shape[2]
+        self.input_size = height if isinstance(height, int) else input_size
+        self.batched = not isinstance(model_input.shape[0], int)
+
+    def _letterbox(self, frame):
+        size = self.input_size
+        h, w = frame.shape[:2]
+        scale = size / max(h, w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        top, left = (size - new_h) // 2, (size - new_w) // 2
+        canvas[top:top + new_h, left:left + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+        return canvas
+
+    def _preprocess(self, frames):
+        batch = np.stack([self._letterbox(frame) for frame in frames])
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1]
+        batch = batch[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def _run(self, batch):
+        # Output is (N, 4 + num_classes, anchors): box coords then class scores
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return output[:, 4 + COCO_CELL_PHONE, :].max(axis=1)
+
+    def detect(self, frames):
+        batch = self._preprocess(frames)
+
+        if self.batched:
+            scores = self._run(batch)
+        else:
+            scores = np.concatenate([self._run(batch[i:i + 1]) for i in range(len(batch))])
+
+        scores = np.where(scores >= self.confidence, scores, 0.0)
+        return [float(s) for s in scores]
+
+
+def load_phone_detector(backend, confidence, onnx_model_path, input_size):
+    if backend == "onnx":
+        return OnnxPhoneDetector(onnx_model_path, confidence=confidence, input_size=input_size)
+    if backend == "ultralytics":
+        return UltralyticsPhoneDetector(confidence=confidence)
+    raise ValueError(f"Unknown PHONE_BACKEND '{backend}'")
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("evidence")
+
+
+class EvidenceStore:
+    """
+    Content-addressed store for evidence images.
+
+    The uploaded JPEG bytes are written as-is (no decode/re-encode) to
+    `<root>/<h[0:2]>/<h[2:4]>/<h>.jpg`, where `h` is their SHA-256, so
+    identical frames are stored once and no directory grows unbounded.
+    `save` returns the path straight away; the write happens on a
+    background task.
+    """
+
+    def __init__(self, root="evidence", thumbnails=False, max_queued=1000, remembered=4096):
+        self.root = root
+        self.thumbnails = thumbnails
+        self.max_queued = max_queued
+        self.remembered = remembered
+
+        self.written = 0
+        self.deduplicated = 0
+
+        # Recently saved hashes, so repeats skip even the exists() check
+        self._recent = OrderedDict()
+        self._queue = None
+        self._task = None
+
+        os.makedirs(root, exist_ok=True)
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Flush what's queued so accepted evidence isn't lost on shutdown
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def path_for(self, digest, suffix=""):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}{suffix}.jpg")
+
+    async def save(self, contents):
+        digest = hashlib.sha256(contents).hexdigest()
+        path = self.path_for(digest)
+
+        if digest in self._recent:
+            self._recent.move_to_end(digest)
+            self.deduplicated += 1
+            return path
+
+        self._recent[digest] = True
+        if len(self._recent) > self.remembered:
+            self._recent.popitem(last=False)
+
+        # Waits only if the writer is this far behind
+        await self._queue.put((digest, contents))
+        return path
+
+    async def _run(self):
+        while True:
+            digest, contents = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._write, digest, contents)
+            except Exception:
+                logger.exception("Failed to write evidence %s", digest)
+                self._recent.pop(digest, None)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, digest, contents):
+        path = self.path_for(digest)
+
+        if os.path.exists(path):
+            self.deduplicated += 1
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_atomic(path, contents)
+        self.written += 1
+
+        if self.thumbnails:
+            np_arr = np.frombuffer(contents, np.uint8)
+            small = cv2.imdecode(np_arr, cv2.IMREAD_REDUCED_COLOR_4)
+            if small is not None:
+                ok, encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                if ok:
+                    self._write_atomic(self.path_for(digest, "_thumb"), encoded.tobytes())
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "deduplicated": self.deduplicated
+        }
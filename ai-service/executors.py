@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    def __init__(self, pool_name):
+        super().__init__(f"{pool_name} queue is full")
+        self.pool_name = pool_name
+
+
+class ModelPool:
+    """
+    A bounded set of worker threads dedicated to one kind of work.
+
+    Each worker thread gets its own copy of whatever `load_worker_state`
+    returns (e.g. its own model instance), so non thread-safe models are never
+    shared. Once `workers + max_queue` calls are in flight, new calls are
+    rejected with `Overloaded` instead of piling up behind a slow model.
+    """
+
+    def __init__(self, name, workers, max_queue, load_worker_state=None):
+        self.name = name
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.load_worker_state = load_worker_state
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.loaded_workers = 0
+
+        self._local = threading.local()
+        self._loaded_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix=f"{name}-worker"
+        )
+
+    def worker_state(self):
+        # Called from inside a worker thread; loads that thread's state once
+        if not hasattr(self._local, "state"):
+            self._local.state = self.load_worker_state() if self.load_worker_state else None
+            with self._loaded_lock:
+                self.loaded_workers += 1
+        return self._local.state
+
+    def is_loaded(self):
+        return self.loaded_workers >= self.workers
+
+    def warm_up(self):
+        # Blocks until every worker thread has loaded its state; the barrier
+        # keeps one thread from picking up more than one of these calls
+        barrier = threading.Barrier(self.workers)
+
+        def load():
+            try:
+                self.worker_state()
+            except Exception:
+                barrier.abort()
+                raise
+            barrier.wait()
+
+        futures = [self._executor.submit(load) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def has_capacity(self):
+        return self.pending < self.max_pending
+
+    async def run(self, fn, *args):
+        if not self.has_capacity():
+            self.rejected += 1
+            raise Overloaded(self.name)
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "loaded_workers": self.loaded_workers
+        }
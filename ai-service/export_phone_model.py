@@ -0,0 +1,38 @@
+"""
+Export the phone detector for PHONE_BACKEND=onnx.
+
+    python export_phone_model.py --imgsz 320 --int8
+
+writes yolov8n.onnx (and yolov8n.int8.onnx with --int8) next to the weights.
+"""
+import argparse
+
+from ultralytics import YOLO
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default="yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--int8", action="store_true", help="also write a dynamically quantized INT8 model")
+    args = parser.parse_args()
+
+    # dynamic=True keeps the batch dimension open so frames can be batched
+    onnx_path = YOLO(args.weights).export(
+        format="onnx",
+        imgsz=args.imgsz,
+        dynamic=True,
+        simplify=True
+    )
+    print(f"Exported {onnx_path}")
+
+    if args.int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = onnx_path.replace(".onnx", ".int8.onnx")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+        print(f"Quantized {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+# Start-of-frame markers carry the image size; C4/C8/CC are other segments
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+class UnreadableFrame(Exception):
+    pass
+
+
+_REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def jpeg_dimensions(data):
+    # Walks the JPEG segment headers up to the SOF marker, without decoding
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+
+    return None
+
+
+def decode_frame(contents, max_width, max_height):
+    """
+    Decode a JPEG no larger than needed: when the image is at least 2x the
+    target size, let libjpeg decode it at 1/2, 1/4 or 1/8 scale directly.
+    """
+    np_arr = np.frombuffer(contents, np.uint8)
+    flag = cv2.IMREAD_COLOR
+
+    size = jpeg_dimensions(contents)
+    if size is not None:
+        width, height = size
+        for factor, reduced_flag in _REDUCED_FLAGS:
+            if width // factor >= max_width and height // factor >= max_height:
+                flag = reduced_flag
+                break
+
+    return cv2.imdecode(np_arr, flag)
@@ -0,0 +1,99 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class _SessionState:
+    __slots__ = ("thumb", "verdict", "checked_at", "seen_at")
+
+    def __init__(self, thumb, verdict, checked_at):
+        self.thumb = thumb
+        self.verdict = verdict
+        self.checked_at = checked_at
+        self.seen_at = checked_at
+
+
+class MotionGate:
+    """
+    Per-session scene-change gate in front of the detectors.
+
+    Keeps a tiny grayscale thumbnail of the last fully analysed frame. A new
+    frame whose thumbnail is close to it reuses that frame's verdict instead
+    of running the models again, until `max_reuse_seconds` have passed since
+    the last full check.
+    """
+
+    def __init__(self, threshold=6.0, max_reuse_seconds=10.0, size=32, idle_ttl_seconds=600):
+        self.threshold = threshold
+        self.max_reuse_seconds = max_reuse_seconds
+        self.size = size
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self.full_checks = 0
+        self.reused = 0
+
+        self._sessions = {}
+        self._last_prune = time.monotonic()
+
+    def thumbnail(self, contents):
+        # 1/8 scale grayscale decode is a fraction of the cost of a full decode
+        np_arr = np.frombuffer(contents, np.uint8)
+        small = cv2.imdecode(np_arr, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if small is None:
+            return None
+
+        thumb = cv2.resize(small, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        thumb = thumb.astype(np.float32)
+
+        # Remove the mean so webcam auto-exposure drift doesn't count as motion
+        thumb -= thumb.mean()
+        return thumb
+
+    def cached_verdict(self, session_id, thumb, now):
+        state = self._sessions.get(session_id)
+
+        if state is None or thumb is None:
+            return None
+
+        state.seen_at = now
+
+        if now - state.checked_at >= self.max_reuse_seconds:
+            return None
+
+        difference = float(np.abs(thumb - state.thumb).mean())
+        if difference > self.threshold:
+            return None
+
+        self.reused += 1
+        return state.verdict
+
+    def record(self, session_id, thumb, verdict, now):
+        self.full_checks += 1
+
+        if thumb is not None:
+            self._sessions[session_id] = _SessionState(thumb, verdict, now)
+
+        if now - self._last_prune > self.idle_ttl_seconds:
+            self._prune(now)
+
+    def forget(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def _prune(self, now):
+        self._last_prune = now
+        stale = [
+            session_id for session_id, state in self._sessions.items()
+            if now - state.seen_at > self.idle_ttl_seconds
+        ]
+        for session_id in stale:
+            del self._sessions[session_id]
+
+    def stats(self):
+        total = self.full_checks + self.reused
+        return {
+            "sessions": len(self._sessions),
+            "full_checks": self.full_checks,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reused / total, 3) if total else 0.0
+        }
@@ -1,18 +1,29 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from typing import List
 import cv2
 import numpy as np
-import mediapipe as mp
-import requests
+import httpx
+import asyncio
+import logging
+import uuid
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import time
 from datetime import datetime
-from insightface.app import FaceAnalysis
 import json
-from ultralytics import YOLO
+from batching import MicroBatcher
+from executors import ModelPool, Overloaded
+from gating import MotionGate
+from outbox import FileOutbox, OutboxDispatcher
+from evidence import EvidenceStore
+from registry import ModelRegistry, ModelUnavailable
+from detectors import load_phone_detector
+from frames import UnreadableFrame, decode_frame
+from reverify import IdentityReverifier, largest_face
+from smoothing import EpisodeTracker, Signal
 
-os.makedirs("evidence", exist_ok=True)
-
-phone_model= YOLO("yolov8n.pt")
+logger = logging.getLogger("ai-service")
 
 app = FastAPI()
 
@@ -24,94 +35,626 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-mp_face = mp.solutions.face_detection
-face_detection = mp_face.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+BACKEND_URL = "http://backend:8000"
 
-face_app = FaceAnalysis(name="buffalo_l")
-face_app.prepare(ctx_id=0)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "20"))
 
-BACKEND_URL = "http://backend:8000"
+CPU_COUNT = os.cpu_count() or 1
+DETECT_WORKERS = int(os.getenv("DETECT_WORKERS", str(CPU_COUNT)))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+MAX_QUEUED_FRAMES = int(os.getenv("MAX_QUEUED_FRAMES", str(DETECT_WORKERS * BATCH_MAX_SIZE * 4)))
+MAX_QUEUED_EMBEDDINGS = int(os.getenv("MAX_QUEUED_EMBEDDINGS", "32"))
+MAX_EMBEDDING_BATCH = int(os.getenv("MAX_EMBEDDING_BATCH", "64"))
 
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "6.0"))
+GATE_MAX_REUSE_SECONDS = float(os.getenv("GATE_MAX_REUSE_SECONDS", "10"))
 
-@app.post("/analyze/{session_id}")
-async def analyze_frame(session_id: int, file: UploadFile = File(...)):
-    contents = await file.read()
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", "outbox")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+
+EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "evidence")
+EVIDENCE_THUMBNAILS = os.getenv("EVIDENCE_THUMBNAILS", "0") == "1"
+
+# Which model pools this worker hosts, e.g. "embed" for an enrollment-only pool
+AI_MODELS = [m.strip() for m in os.getenv("AI_MODELS", "detect,embed").split(",") if m.strip()]
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# "ultralytics" (PyTorch) or "onnx" (see export_phone_model.py)
+PHONE_BACKEND = os.getenv("PHONE_BACKEND", "ultralytics")
+PHONE_ONNX_MODEL = os.getenv("PHONE_ONNX_MODEL", "yolov8n.onnx")
+PHONE_CONFIDENCE = float(os.getenv("PHONE_CONFIDENCE", "0.25"))
+PHONE_INPUT_SIZE = int(os.getenv("PHONE_INPUT_SIZE", "320"))
+
+# Advertised to clients via /capture-profile; larger uploads are decoded reduced
+CAPTURE_MAX_WIDTH = int(os.getenv("CAPTURE_MAX_WIDTH", "640"))
+CAPTURE_MAX_HEIGHT = int(os.getenv("CAPTURE_MAX_HEIGHT", "480"))
+CAPTURE_JPEG_QUALITY = float(os.getenv("CAPTURE_JPEG_QUALITY", "0.7"))
+CAPTURE_INTERVAL_MS = int(os.getenv("CAPTURE_INTERVAL_MS", "2000"))
+
+# In-exam identity re-verification against the enrolled face
+REVERIFY_INTERVAL_SECONDS = float(os.getenv("REVERIFY_INTERVAL_SECONDS", "60"))
+
+# Temporal smoothing: a violation is reported once per sustained episode,
+# from the mean detector score over a short window (see smoothing.py)
+NO_FACE_WINDOW_SECONDS = float(os.getenv("NO_FACE_WINDOW_SECONDS", "6"))
+NO_FACE_ON = float(os.getenv("NO_FACE_ON", "0.7"))
+NO_FACE_OFF = float(os.getenv("NO_FACE_OFF", "0.3"))
+NO_FACE_START_SECONDS = float(os.getenv("NO_FACE_START_SECONDS", "4"))
+NO_FACE_END_SECONDS = float(os.getenv("NO_FACE_END_SECONDS", "4"))
+
+PHONE_WINDOW_SECONDS = float(os.getenv("PHONE_WINDOW_SECONDS", "4"))
+PHONE_ON = float(os.getenv("PHONE_ON", "0.4"))
+PHONE_OFF = float(os.getenv("PHONE_OFF", "0.2"))
+PHONE_START_SECONDS = float(os.getenv("PHONE_START_SECONDS", "2"))
+PHONE_END_SECONDS = float(os.getenv("PHONE_END_SECONDS", "4"))
+
+# Parallelism comes from the worker pools below, one model instance per
+# worker thread, so keep each library from also spawning a thread per core
+cv2.setNumThreads(1)
+
+
+# --------------------------------
+#  Worker Pools
+# --------------------------------
+# Model libraries are imported inside the loaders so a worker only pays
+# for the models it hosts, and only once it first needs them
+def load_detectors():
+    import mediapipe as mp
+
+    face_detection = mp.solutions.face_detection.FaceDetection(
+        model_selection=0, min_detection_confidence=0.5
+    )
+    phone_detector = load_phone_detector(
+        PHONE_BACKEND, PHONE_CONFIDENCE, PHONE_ONNX_MODEL, PHONE_INPUT_SIZE
+    )
+    return face_detection, phone_detector
+
+
+def load_face_app():
+    from insightface.app import FaceAnalysis
+
+    face_app = FaceAnalysis(name="buffalo_l")
+    face_app.prepare(ctx_id=0)
+    return face_app
 
+
+io_pool = ModelPool("io", IO_WORKERS, max_queue=MAX_QUEUED_FRAMES)
+detect_pool = ModelPool("detect", DETECT_WORKERS, max_queue=0, load_worker_state=load_detectors)
+embed_pool = ModelPool("embed", EMBED_WORKERS, max_queue=MAX_QUEUED_EMBEDDINGS, load_worker_state=load_face_app)
+
+model_registry = ModelRegistry(AI_MODELS, lazy=not MODEL_WARMUP)
+model_registry.register("detect", detect_pool)
+model_registry.register("embed", embed_pool)
+
+http_client = None
+warm_up_task = None
+
+# Fire-and-forget tasks are kept referenced here until they finish
+background_tasks = set()
+
+
+def decode_image(contents):
     np_arr = np.frombuffer(contents, np.uint8)
-    frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+
+def decode_analysis_frame(contents):
+    frame = decode_frame(contents, CAPTURE_MAX_WIDTH, CAPTURE_MAX_HEIGHT)
+    if frame is None:
+        raise UnreadableFrame("Unreadable frame")
+    return frame
+
+
+# --------------------------------
+#  Batched Detection
+# --------------------------------
+def detect_batch(frames):
+    # A frame that fails gets its exception as its result, so it fails only
+    # its own request and not the other sessions batched with it
+    face_detection, phone_detector = detect_pool.worker_state()
+    results = []
+
+    # MediaPipe has no batch API, but running it here keeps it on one thread
+    for frame in frames:
+        try:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            detections = face_detection.process(rgb_frame).detections
+        except Exception as exc:
+            results.append(exc)
+            continue
+
+        face_score = max((d.score[0] for d in detections), default=0.0) if detections else 0.0
+        results.append({"face": float(face_score), "phone": 0.0})
+
+    # Only frames with a face go on to the phone detector, as one batched call
+    with_face = [i for i, r in enumerate(results) if isinstance(r, dict) and r["face"] > 0]
+
+    if with_face:
+        try:
+            phone_scores = phone_detector.detect([frames[i] for i in with_face])
+        except Exception:
+            # Find the frame at fault by retrying them one at a time
+            phone_scores = []
+            for i in with_face:
+                try:
+                    phone_scores.extend(phone_detector.detect([frames[i]]))
+                except Exception as exc:
+                    results[i] = exc
+                    phone_scores.append(0.0)
+
+        for i, score in zip(with_face, phone_scores):
+            if isinstance(results[i], dict):
+                results[i]["phone"] = float(score)
+
+    return results
+
+
+evidence_store = EvidenceStore(EVIDENCE_DIR, thumbnails=EVIDENCE_THUMBNAILS)
+
+motion_gate = MotionGate(
+    threshold=MOTION_THRESHOLD,
+    max_reuse_seconds=GATE_MAX_REUSE_SECONDS
+)
+
+reverifier = IdentityReverifier(
+    interval_seconds=REVERIFY_INTERVAL_SECONDS
+)
+
+# Detector scores per frame, in this order: face absence, phone
+VIOLATION_SIGNALS = [
+    Signal("no_face", NO_FACE_WINDOW_SECONDS, NO_FACE_ON, NO_FACE_OFF, NO_FACE_START_SECONDS, NO_FACE_END_SECONDS),
+    Signal("phone", PHONE_WINDOW_SECONDS, PHONE_ON, PHONE_OFF, PHONE_START_SECONDS, PHONE_END_SECONDS),
+]
+
+# signal -> (violation_type, severity) reported to the backend
+VIOLATION_TYPES = {
+    "no_face": ("no_face", "LOW"),
+    "phone": ("mobile_phone_detected", "HIGH"),
+}
+
+episodes = EpisodeTracker(VIOLATION_SIGNALS)
+
+frame_batcher = MicroBatcher(
+    "frames",
+    detect_batch,
+    detect_pool,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_pending=MAX_QUEUED_FRAMES
+)
+
+
+@app.on_event("startup")
+async def startup():
+    global http_client, warm_up_task
+    http_client = httpx.AsyncClient(base_url=BACKEND_URL, timeout=10)
+
+    # Serve right away; models load in the background (or on first use)
+    if MODEL_WARMUP:
+        warm_up_task = asyncio.create_task(model_registry.warm_up())
+
+    if model_registry.hosts("detect"):
+        frame_batcher.start()
+    evidence_store.start()
+    violation_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await frame_batcher.stop()
+    await evidence_store.stop()
+    await violation_dispatcher.stop()
+    violation_outbox.close()
+    await http_client.aclose()
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    for pool in [io_pool] + model_registry.pools():
+        pool.shutdown()
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    # The client drops this frame and sends the next one on its usual schedule
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(UnreadableFrame)
+async def unreadable_frame_handler(request, exc: UnreadableFrame):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(ModelUnavailable)
+async def model_unavailable_handler(request, exc: ModelUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "models": model_registry.status()}
+
+
+@app.get("/health/ready")
+def ready():
+    # For load balancers: only route traffic once every hosted model is loaded
+    if not model_registry.is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "models": model_registry.status()}
+        )
+    return {"ready": True, "models": model_registry.status()}
+
+
+@app.get("/capture-profile")
+def capture_profile():
+    # What the exam client should downscale and encode frames to before upload
+    return {
+        "max_width": CAPTURE_MAX_WIDTH,
+        "max_height": CAPTURE_MAX_HEIGHT,
+        "jpeg_quality": CAPTURE_JPEG_QUALITY,
+        "interval_ms": CAPTURE_INTERVAL_MS
+    }
+
+
+@app.get("/metrics/batching")
+def batching_metrics():
+    return {frame_batcher.name: frame_batcher.stats()}
+
+
+@app.get("/metrics/gating")
+def gating_metrics():
+    return motion_gate.stats()
+
+
+@app.get("/metrics/evidence")
+def evidence_metrics():
+    return evidence_store.stats()
+
+
+@app.get("/metrics/outbox")
+def outbox_metrics():
+    return violation_dispatcher.stats()
+
+
+@app.get("/metrics/reverify")
+def reverify_metrics():
+    return reverifier.stats()
+
+
+@app.get("/metrics/episodes")
+def episode_metrics():
+    return episodes.stats()
+
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
-    filename = f"evidence/session_{session_id}_{timestamp}.jpg"
+@app.get("/metrics/pools")
+def pool_metrics():
+    return {pool.name: pool.stats() for pool in [io_pool] + model_registry.pools()}
+
+
+# --------------------------------
+#  Violation Outbox
+# --------------------------------
+violation_outbox = FileOutbox(OUTBOX_DIR)
+
+# Latest state the backend returned for each session, e.g. {"status": "terminated"}
+session_states = {}
+
+# Open analysis WebSockets per session, for pushing status changes
+session_sockets = {}
+
+
+async def push_session_state(session_id, state):
+    for websocket in list(session_sockets.get(session_id, ())):
+        try:
+            await websocket.send_json({"type": "status", "backend": state})
+        except Exception:
+            session_sockets[session_id].discard(websocket)
+
+
+async def deliver_violations(records):
+    violations = []
+    for record in records:
+        violation = {key: value for key, value in record.items() if key != "id"}
+        violation["idempotency_key"] = record.get("idempotency_key", record["id"])
+        violations.append(violation)
+
+    response = await http_client.post(
+        "/sessions/violations/bulk",
+        json={"violations": violations}
+    )
+
+    if response.status_code >= 500 or response.status_code in (408, 429):
+        response.raise_for_status()
+
+    if response.status_code >= 400:
+        # A malformed record won't get better on retry, but the rest of the
+        # batch must not be dropped with it: split until it is found
+        if len(records) > 1:
+            middle = len(records) // 2
+            await deliver_violations(records[:middle])
+            await deliver_violations(records[middle:])
+            return
+
+        logger.warning(
+            "Backend rejected violation %s, dropping it: %s",
+            violations[0]["idempotency_key"], response.text
+        )
+        return
+
+    # Results come back in order, so the last one per session is its current state
+    for result in response.json()["results"]:
+        if "error" in result:
+            logger.warning("Violation %s not stored: %s", result["idempotency_key"], result["error"])
+            continue
+
+        previous = session_states.get(result["session_id"])
+        session_states[result["session_id"]] = result
+
+        if result["status"] == "terminated" and (previous or {}).get("status") != "terminated":
+            await push_session_state(result["session_id"], result)
+
+
+violation_dispatcher = OutboxDispatcher(
+    violation_outbox,
+    deliver_violations,
+    batch_size=OUTBOX_BATCH_SIZE
+)
+
+
+async def report_violation(session_id, params, record_id=None):
+    # The backend dedupes on params["idempotency_key"], or the record id when
+    # there is none: re-sending a key it has stored (e.g. an episode end
+    # carrying ended_at) updates that violation instead of adding one
+    record = {
+        "id": record_id or uuid.uuid4().hex,
+        "session_id": session_id,
+        "detected_at": datetime.utcnow().isoformat(),
+        **params
+    }
+
+    await asyncio.to_thread(violation_outbox.append, record)
+    violation_dispatcher.notify()
+
+    # The record is delivered in the background, so answer with the last
+    # known state; a termination shows up on the session's next frame, or
+    # is pushed straight away over the session's WebSocket
+    return session_states.get(session_id)
+
+
+# ---------------------------------
+#  Identity Re-verification
+# ---------------------------------
+async def reverify_identity(session_id, contents):
+    checked = False
+
+    try:
+        img = await io_pool.run(decode_image, contents)
+        if img is None:
+            return
+
+        faces = await model_registry.pool("embed").run(extract_faces, img)
+
+        if not faces:
+            # Face absence is the no_face check's job
+            return
+
+        response = await http_client.post(
+            f"/sessions/{session_id}/reverify",
+            json={"embedding": largest_face(faces).embedding.tolist()}
+        )
+        if response.status_code == 404:
+            reverifier.set_unenrolled(session_id)
+            return
+        response.raise_for_status()
+
+        checked = True
+
+        if not reverifier.record(response.json()["match"]):
+            evidence_url = await evidence_store.save(contents)
+
+            await report_violation(session_id, {
+                "violation_type": "identity_mismatch",
+                "severity": "MEDIUM",
+                # The backend only says whether the face matched
+                "confidence": 1.0,
+                "evidence_url": evidence_url
+            })
+    except (Overloaded, httpx.HTTPError):
+        pass
+    except Exception:
+        logger.exception("Identity re-verification failed for session %s", session_id)
+    finally:
+        reverifier.finish(session_id, time.monotonic(), checked=checked)
+
+
+async def analyze_contents(session_id, contents):
+    # Reject before decoding when detection is already saturated
+    if not io_pool.has_capacity() or not frame_batcher.has_capacity():
+        raise Overloaded(frame_batcher.name)
 
     # ---------------
-    #  Face Detection
+    #  Scene-change Gate
     # -----------------
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_detection.process(rgb_frame)
-
-    if not results.detections:
-        cv2.imwrite(filename, frame)
-
-        response = requests.post(
-            f"{BACKEND_URL}/sessions/violation/{session_id}",
-            params={
-                "violation_type": "no_face",
-                "severity": "LOW",
-                "confidence": 0.9,
-                "evidence_url": filename
-            }
-        )
+    thumb = await io_pool.run(motion_gate.thumbnail, contents)
+    now = time.monotonic()
+
+    detection = motion_gate.cached_verdict(session_id, thumb, now)
+
+    if detection is None:
+        frame = await io_pool.run(decode_analysis_frame, contents)
+        detection = await frame_batcher.submit(frame)
+        motion_gate.record(session_id, thumb, detection, now)
+
+    # ---------------------
+    #  Violation Episodes
+    # ---------------------
+    # Smoothed over recent frames: one violation when an episode starts,
+    # and its end time once it is over
+    backend = None
+    events = episodes.observe(
+        session_id, (1.0 - detection["face"], detection["phone"]), now, datetime.utcnow()
+    )
 
+    for kind, episode_session, episode in events:
+        violation_type, severity = VIOLATION_TYPES[episode.signal]
+        params = {
+            "violation_type": violation_type,
+            "severity": severity,
+            "confidence": round(episode.confidence, 4),
+            "detected_at": episode.started_at.isoformat()
+        }
+
+        if kind == "start":
+            params["evidence_url"] = await evidence_store.save(contents)
+            backend = await report_violation(episode_session, params, record_id=episode.id)
+        else:
+            # Its own outbox record, so it can't replace or be acked along
+            # with a start record that is still waiting to be delivered
+            params["ended_at"] = episode.ended_at.isoformat()
+            params["idempotency_key"] = episode.id
+            await report_violation(episode_session, params, record_id=f"{episode.id}:end")
+
+    active = episodes.active(session_id)
+    if active:
         return {
             "violation": True,
-            "backend": response.json()
+            "episodes": active,
+            "backend": backend or session_states.get(session_id)
         }
 
-    # --------------
-    #  Mobile Phone Detection
     # -------------------------
-    phone_results = phone_model(frame)
-
-    for r in phone_results:
-        for box in r.boxes:
-            class_id = int(box.cls[0])
-            label = phone_model.names[class_id]
-
-            if label == "cell phone":
-                cv2.imwrite(filename, frame)
-
-                response = requests.post(
-                    f"{BACKEND_URL}/sessions/violation/{session_id}",
-                    params={
-                        "violation_type": "mobile_phone_detected",
-                        "severity": "HIGH",
-                        "confidence": 0.95,
-                        "evidence_url": filename
-                    }
-                )
-
-                return {
-                    "violation": True,
-                    "backend": response.json()
-                }
+    #  Periodic Identity Check
+    # -------------------------
+    # Runs in the background on a few frames per session; a mismatch is
+    # reported through the outbox like any other violation
+    if model_registry.hosts("embed") and reverifier.claim(session_id, now):
+        task = asyncio.create_task(reverify_identity(session_id, contents))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
 
     # -------------------------
     # 3️⃣ No Violation
     # -------------------------
     return {"violation": False}
 
+
+@app.post("/analyze/{session_id}")
+async def analyze_frame(session_id: int, file: UploadFile = File(...)):
+    model_registry.pool("detect")
+
+    contents = await file.read()
+
+    return await analyze_contents(session_id, contents)
+
+
+# ---------------------------------
+#  Streaming Analysis (WebSocket)
+# ---------------------------------
+@app.websocket("/ws/analyze/{session_id}")
+async def analyze_stream(websocket: WebSocket, session_id: int):
+    # One persistent channel per exam session: binary JPEG frames in,
+    # JSON verdicts out, plus "status" pushes when the session is terminated
+    if not model_registry.hosts("detect"):
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    session_sockets.setdefault(session_id, set()).add(websocket)
+
+    try:
+        while True:
+            contents = await websocket.receive_bytes()
+
+            try:
+                verdict = await analyze_contents(session_id, contents)
+            except Overloaded:
+                await websocket.send_json({"type": "dropped"})
+                continue
+            except UnreadableFrame as exc:
+                await websocket.send_json({"type": "error", "detail": str(exc)})
+                continue
+
+            await websocket.send_json({"type": "verdict", **verdict})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sockets = session_sockets.get(session_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del session_sockets[session_id]
+
+
+def extract_faces(img):
+    return embed_pool.worker_state().get(img)
+
+
 @app.post("/generate-embedding")
 async def generate_embedding(file: UploadFile = File(...)):
     contents = await file.read()
 
-    np_arr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    pool = model_registry.pool("embed")
+
+    img = await io_pool.run(decode_image, contents)
 
-    faces = face_app.get(img)
+    faces = await pool.run(extract_faces, img)
 
     if not faces:
         return {"error": "No face detected"}
 
     embedding = faces[0].embedding.tolist()
 
-    return {"embedding": embedding}
\ No newline at end of file
+    return {"embedding": embedding}
+
+
+def embed_images(images):
+    # Runs in one embed worker: decode and embed a chunk of uploaded photos
+    face_app = embed_pool.worker_state()
+    results = []
+
+    for contents in images:
+        img = decode_image(contents)
+
+        if img is None:
+            results.append({"error": "Unreadable image"})
+            continue
+
+        faces = face_app.get(img)
+
+        if not faces:
+            results.append({"error": "No face detected"})
+            continue
+
+        results.append({"embedding": faces[0].embedding.tolist()})
+
+    return results
+
+
+@app.post("/generate-embeddings")
+async def generate_embeddings(files: List[UploadFile] = File(...)):
+    pool = model_registry.pool("embed")
+
+    if len(files) > MAX_EMBEDDING_BATCH:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"At most {MAX_EMBEDDING_BATCH} images per request"}
+        )
+
+    images = [await f.read() for f in files]
+
+    # One chunk per embed worker, so a batch spreads across all of them
+    chunk_size = -(-len(images) // pool.workers)
+    chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+
+    chunk_results = await asyncio.gather(*[pool.run(embed_images, chunk) for chunk in chunks])
+
+    results = []
+    for f, result in zip(files, [r for chunk in chunk_results for r in chunk]):
+        results.append({"filename": f.filename, **result})
+
+    return {"results": results}
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("outbox")
+
+
+class FileOutbox:
+    """
+    Durable queue of records waiting to be delivered, kept as an
+    append-only JSON lines log.
+
+    Every `append` and `ack` is written and fsynced before returning, so
+    records that were appended but not acked are replayed after a restart.
+    The log is rewritten with just the pending records once it grows past
+    `compact_bytes`.
+    """
+
+    def __init__(self, directory, name="violations", compact_bytes=4 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.log")
+        self.compact_bytes = compact_bytes
+
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+
+                if entry.get("op") == "add":
+                    self._pending[entry["record"]["id"]] = entry["record"]
+                elif entry.get("op") == "ack":
+                    for record_id in entry["ids"]:
+                        self._pending.pop(record_id, None)
+
+        if self._pending:
+            logger.info("Replaying %d undelivered records from %s", len(self._pending), self.path)
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, record):
+        with self._lock:
+            self._write({"op": "add", "record": record})
+            self._pending[record["id"]] = record
+
+    def pending(self, limit):
+        with self._lock:
+            records = []
+            for record in self._pending.values():
+                if len(records) >= limit:
+                    break
+                records.append(record)
+            return records
+
+    def ack(self, ids):
+        with self._lock:
+            self._write({"op": "ack", "ids": list(ids)})
+            for record_id in ids:
+                self._pending.pop(record_id, None)
+
+            if self._file.tell() > self.compact_bytes:
+                self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            for record in self._pending.values():
+                tmp.write(json.dumps({"op": "add", "record": record}) + "\n")
+            tmp.flush()
+            os.fsync(tmp.fileno())
+
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def __len__(self):
+        return len(self._pending)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class OutboxDispatcher:
+    """
+    Background consumer that drains an outbox in batches through `deliver`.
+
+    `deliver(records)` is a coroutine that raises if the batch should be
+    retried. A failed batch stays in the outbox and is retried with
+    exponential backoff, so `deliver` must be idempotent per record id.
+    """
+
+    def __init__(self, outbox, deliver, batch_size=100, poll_seconds=1.0, max_backoff_seconds=30.0):
+        self.outbox = outbox
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self.delivered = 0
+        self.failures = 0
+
+        self._wake = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        backoff = self.poll_seconds
+
+        while True:
+            batch = self.outbox.pending(self.batch_size)
+
+            if not batch:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+
+            try:
+                await self.deliver(batch)
+            except Exception:
+                logger.exception("Delivering %d records failed, retrying in %.1fs", len(batch), backoff)
+                self.failures += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff_seconds)
+                continue
+
+            backoff = self.poll_seconds
+            self.delivered += len(batch)
+            await asyncio.to_thread(self.outbox.ack, [r["id"] for r in batch])
+
+    def stats(self):
+        return {
+            "pending": len(self.outbox),
+            "delivered": self.delivered,
+            "failures": self.failures
+        }
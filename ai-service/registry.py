@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("registry")
+
+
+class ModelUnavailable(Exception):
+    def __init__(self, name):
+        super().__init__(f"Model '{name}' is not hosted by this worker")
+        self.name = name
+
+
+class ModelRegistry:
+    """
+    Tracks which model pools this worker hosts and whether they are loaded.
+
+    Pools load their models lazily on first use; `warm_up` loads every
+    enabled pool in the background right after startup so the first real
+    request doesn't pay for it. Disabled models are never imported.
+
+    With `lazy=True` (no warm-up), a pool counts as ready before it has
+    loaded: its first requests load it, so traffic must be let in.
+    """
+
+    def __init__(self, enabled, lazy=False):
+        self.enabled = set(enabled)
+        self.lazy = lazy
+        self._pools = {}
+        self._status = {}
+        self._load_seconds = {}
+        self._errors = {}
+
+    def register(self, name, pool):
+        self._pools[name] = pool
+        if name not in self.enabled:
+            self._status[name] = "disabled"
+        else:
+            self._status[name] = "lazy" if self.lazy else "not_loaded"
+
+    def hosts(self, name):
+        return name in self.enabled and name in self._pools
+
+    def pool(self, name):
+        if not self.hosts(name):
+            raise ModelUnavailable(name)
+        return self._pools[name]
+
+    def pools(self):
+        return [self._pools[name] for name in self._pools if name in self.enabled]
+
+    async def warm_up(self):
+        for name in self._pools:
+            if name not in self.enabled:
+                continue
+
+            self._status[name] = "loading"
+            started = time.perf_counter()
+
+            try:
+                await asyncio.to_thread(self._pools[name].warm_up)
+            except Exception as exc:
+                logger.exception("Warm-up of %s failed", name)
+                self._status[name] = "failed"
+                self._errors[name] = str(exc)
+                continue
+
+            self._status[name] = "ready"
+            self._load_seconds[name] = round(time.perf_counter() - started, 2)
+            logger.info("%s ready in %.2fs", name, self._load_seconds[name])
+
+    def _refresh(self):
+        # Pools loaded on first use rather than by warm_up
+        for name, pool in self._pools.items():
+            if self._status[name] in ("not_loaded", "lazy") and pool.is_loaded():
+                self._status[name] = "ready"
+
+    def is_ready(self):
+        self._refresh()
+        return all(
+            self._status[name] in ("ready", "lazy")
+            for name in self._pools if name in self.enabled
+        )
+
+    def status(self):
+        self._refresh()
+        models = {}
+        for name, status in self._status.items():
+            models[name] = {"status": status}
+            if name in self._load_seconds:
+                models[name]["load_seconds"] = self._load_seconds[name]
+            if name in self._errors:
+                models[name]["error"] = self._errors[name]
+        return models
@@ -0,0 +1,97 @@
+def largest_face(faces):
+    return max(faces, key=lambda f: (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1]))
+
+
+class _SessionState:
+    __slots__ = ("enrolled", "next_check", "in_flight", "seen_at")
+
+    def __init__(self):
+        # False once the backend has no enrolled face for the session
+        self.enrolled = True
+        self.next_check = 0.0
+        self.in_flight = False
+        self.seen_at = 0.0
+
+
+class IdentityReverifier:
+    """
+    Schedules periodic identity checks of live frames against a session's
+    enrolled face. The backend does the comparison and its threshold, so
+    enrolled templates never leave it; this side only learns match or not.
+
+    At most one check per session is in flight, and a session is only due
+    again `interval_seconds` after its last check started, so the ArcFace
+    model runs on a small, bounded fraction of frames.
+    """
+
+    def __init__(self, interval_seconds=60.0, retry_seconds=10.0, idle_ttl_seconds=600):
+        self.interval_seconds = interval_seconds
+        self.retry_seconds = retry_seconds
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self.checks = 0
+        self.mismatches = 0
+
+        self._sessions = {}
+        self._last_prune = 0.0
+
+    def claim(self, session_id, now):
+        # True if this frame should be checked; the caller must then call finish()
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionState()
+            # Let the session settle in before its first check
+            state.next_check = now + self.retry_seconds
+
+        state.seen_at = now
+
+        if not state.enrolled or state.in_flight or now < state.next_check:
+            return False
+
+        state.in_flight = True
+        state.next_check = now + self.interval_seconds
+        return True
+
+    def finish(self, session_id, now, checked=True):
+        state = self._sessions.get(session_id)
+        if state is None:
+            return
+
+        state.in_flight = False
+        if checked:
+            self.checks += 1
+        else:
+            # Nothing was compared (no face, model busy); try again sooner
+            state.next_check = now + self.retry_seconds
+
+        self._prune(now)
+
+    def set_unenrolled(self, session_id):
+        # Nothing to compare against: stop checking this session
+        state = self._sessions.get(session_id)
+        if state is not None:
+            state.enrolled = False
+
+    def record(self, match):
+        if not match:
+            self.mismatches += 1
+        return match
+
+    def _prune(self, now):
+        if now - self._last_prune < self.idle_ttl_seconds:
+            return
+        self._last_prune = now
+
+        stale = [
+            session_id for session_id, state in self._sessions.items()
+            if not state.in_flight and now - state.seen_at > self.idle_ttl_seconds
+        ]
+        for session_id in stale:
+            del self._sessions[session_id]
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "checks": self.checks,
+            "mismatches": self.mismatches
+        }
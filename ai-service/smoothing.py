@@ -0,0 +1,177 @@
+import uuid
+from datetime import timedelta
+
+import numpy as np
+
+
+class Signal:
+    """
+    One detector output tracked over time, e.g. face absence or phone score.
+
+    An episode starts once the mean score over the last `window_seconds`
+    has stayed at or above `on_threshold` for `start_after_seconds`, and
+    ends once it has stayed below `off_threshold` for `end_after_seconds`.
+    The gap between the two thresholds keeps a borderline score from
+    flapping an episode on and off.
+    """
+
+    def __init__(self, name, window_seconds, on_threshold, off_threshold,
+                 start_after_seconds, end_after_seconds):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.start_after_seconds = start_after_seconds
+        self.end_after_seconds = end_after_seconds
+
+
+class Episode:
+    __slots__ = ("id", "signal", "started_at", "ended_at", "confidence", "quiet_since", "quiet_at")
+
+    def __init__(self, signal, started_at, confidence):
+        self.id = uuid.uuid4().hex
+        self.signal = signal
+        self.started_at = started_at
+        self.ended_at = None
+        self.confidence = confidence
+        # Monotonic and wall-clock time the score last dropped below off_threshold
+        self.quiet_since = None
+        self.quiet_at = None
+
+
+class _SessionState:
+    __slots__ = ("times", "scores", "head", "count", "pending_since", "pending_at", "episodes", "seen_at")
+
+    def __init__(self, signals, max_samples):
+        # Ring buffers: one row of scores per signal, aligned with `times`
+        self.times = np.zeros(max_samples, dtype=np.float64)
+        self.scores = np.zeros((signals, max_samples), dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.pending_since = [None] * signals
+        self.pending_at = [None] * signals
+        self.episodes = [None] * signals
+        self.seen_at = 0.0
+
+
+class EpisodeTracker:
+    """
+    Per-session temporal smoothing of detector scores.
+
+    Each frame's scores go into a small fixed-size ring buffer per session;
+    violations are raised per sustained episode rather than per frame, so a
+    one-frame blip reports nothing and a long absence reports once.
+
+    observe() returns ("start" | "end", session_id, episode) events. Sessions
+    that stop sending frames have their open episodes ended after
+    `idle_ttl_seconds`, at the time they were last seen.
+    """
+
+    def __init__(self, signals, max_samples=16, idle_ttl_seconds=120):
+        self.signals = signals
+        self.max_samples = max_samples
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self.started = 0
+        self.ended = 0
+
+        self._sessions = {}
+        self._last_prune = 0.0
+
+    def _aggregate(self, state, index, now):
+        n = state.count
+        times = state.times[:n]
+        recent = times >= now - self.signals[index].window_seconds
+        return float(state.scores[index, :n][recent].mean()) if recent.any() else 0.0
+
+    def observe(self, session_id, scores, now, wall_now):
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionState(len(self.signals), self.max_samples)
+
+        state.seen_at = now
+        state.times[state.head] = now
+        state.scores[:, state.head] = scores
+        state.head = (state.head + 1) % self.max_samples
+        state.count = min(state.count + 1, self.max_samples)
+
+        events = []
+
+        for i, signal in enumerate(self.signals):
+            level = self._aggregate(state, i, now)
+            episode = state.episodes[i]
+
+            if episode is None:
+                if level < signal.on_threshold:
+                    state.pending_since[i] = None
+                    continue
+
+                if state.pending_since[i] is None:
+                    state.pending_since[i] = now
+                    state.pending_at[i] = wall_now
+
+                if now - state.pending_since[i] >= signal.start_after_seconds:
+                    episode = Episode(signal.name, state.pending_at[i], level)
+                    state.episodes[i] = episode
+                    state.pending_since[i] = None
+                    self.started += 1
+                    events.append(("start", session_id, episode))
+                continue
+
+            episode.confidence = max(episode.confidence, level)
+
+            if level >= signal.off_threshold:
+                episode.quiet_since = None
+                continue
+
+            if episode.quiet_since is None:
+                episode.quiet_since = now
+                episode.quiet_at = wall_now
+
+            if now - episode.quiet_since >= signal.end_after_seconds:
+                episode.ended_at = episode.quiet_at
+                state.episodes[i] = None
+                self.ended += 1
+                events.append(("end", session_id, episode))
+
+        events.extend(self._prune(now, wall_now))
+        return events
+
+    def active(self, session_id):
+        state = self._sessions.get(session_id)
+        if state is None:
+            return []
+        return [episode.signal for episode in state.episodes if episode is not None]
+
+    def _prune(self, now, wall_now):
+        if now - self._last_prune < self.idle_ttl_seconds:
+            return []
+        self._last_prune = now
+
+        events = []
+        stale = [
+            session_id for session_id, state in self._sessions.items()
+            if now - state.seen_at > self.idle_ttl_seconds
+        ]
+
+        for session_id in stale:
+            state = self._sessions.pop(session_id)
+            for episode in state.episodes:
+                if episode is not None:
+                    # Close it at (roughly) the last frame we saw
+                    episode.ended_at = episode.quiet_at or wall_now - timedelta(seconds=now - state.seen_at)
+                    self.ended += 1
+                    events.append(("end", session_id, episode))
+
+        return events
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "open_episodes": sum(
+                episode is not None
+                for state in self._sessions.values() for episode in state.episodes
+            ),
+            "started": self.started,
+            "ended": self.ended
+        }
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+
+from batching import MicroBatcher
+from executors import ModelPool, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_failing_item_fails_only_its_own_request():
+    pool = ModelPool("test", workers=1, max_queue=4)
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [ValueError(f"bad {item}") if item < 0 else item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher("test", process, pool, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                *[batcher.submit(item) for item in [1, -1, 3]], return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    pool.shutdown()
+
+    assert batches == [[1, -1, 3]]
+    assert results[0] == 2 and results[2] == 6
+    assert isinstance(results[1], ValueError)
+
+
+def test_batch_wide_error_fails_every_item():
+    pool = ModelPool("test", workers=1, max_queue=4)
+
+    def process(items):
+        raise RuntimeError("model crashed")
+
+    async def scenario():
+        batcher = MicroBatcher("test", process, pool, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                *[batcher.submit(item) for item in [1, 2]], return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    pool.shutdown()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_full_queue_raises_overloaded():
+    pool = ModelPool("test", workers=1, max_queue=4)
+    release = threading.Event()
+
+    def process(items):
+        # Holds the only worker, so submitted items stay queued
+        release.wait()
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher("test", process, pool, max_batch_size=1, max_wait_ms=0, max_pending=2)
+        batcher.start()
+
+        running = asyncio.ensure_future(batcher.submit(0))
+        while batcher.stats()["pending"]:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        queued = [asyncio.ensure_future(batcher.submit(i)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        assert not batcher.has_capacity()
+
+        with pytest.raises(Overloaded):
+            await batcher.submit(3)
+
+        release.set()
+        results = await asyncio.gather(running, *queued)
+        await batcher.stop()
+        return results
+
+    assert run(scenario()) == [0, 1, 2]
+    pool.shutdown()
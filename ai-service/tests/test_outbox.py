@@ -0,0 +1,51 @@
+from outbox import FileOutbox
+
+
+def record(i):
+    return {"id": f"r{i}", "session_id": 1, "violation_type": "no_face"}
+
+
+def test_unacked_records_are_replayed_after_a_crash(tmp_path):
+    outbox = FileOutbox(str(tmp_path))
+    for i in range(3):
+        outbox.append(record(i))
+    outbox.ack(["r0"])
+    # Crash: no close(), nothing else written
+    del outbox
+
+    replayed = FileOutbox(str(tmp_path))
+
+    assert [r["id"] for r in replayed.pending(10)] == ["r1", "r2"]
+    assert len(replayed) == 2
+
+
+def test_torn_final_line_is_skipped(tmp_path):
+    outbox = FileOutbox(str(tmp_path))
+    outbox.append(record(0))
+    outbox.close()
+
+    with open(outbox.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "record": {"id": "r1"')
+
+    assert [r["id"] for r in FileOutbox(str(tmp_path)).pending(10)] == ["r0"]
+
+
+def test_compaction_keeps_only_pending_records(tmp_path):
+    outbox = FileOutbox(str(tmp_path), compact_bytes=1)
+    for i in range(5):
+        outbox.append(record(i))
+    outbox.ack(["r0", "r2", "r4"])
+    outbox.close()
+
+    with open(outbox.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+    assert [r["id"] for r in FileOutbox(str(tmp_path)).pending(10)] == ["r1", "r3"]
+
+
+def test_pending_respects_limit_and_order(tmp_path):
+    outbox = FileOutbox(str(tmp_path))
+    for i in range(5):
+        outbox.append(record(i))
+
+    assert [r["id"] for r in outbox.pending(2)] == ["r0", "r1"]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from smoothing import EpisodeTracker, Signal
+
+START = datetime(2026, 1, 1, 9, 0, 0)
+
+
+def make_tracker(idle_ttl_seconds=120):
+    # Mean over 1s must reach 0.6 for 0.5s to start, and stay under 0.3 for 1s to end
+    signal = Signal("no_face", window_seconds=1.0, on_threshold=0.6, off_threshold=0.3,
+                    start_after_seconds=0.5, end_after_seconds=1.0)
+    return EpisodeTracker([signal], idle_ttl_seconds=idle_ttl_seconds)
+
+
+def feed(tracker, session_id, scores, t0=0.0, step=0.1):
+    # One frame every `step` seconds; returns (time, event) for every event
+    events = []
+    for i, score in enumerate(scores):
+        now = t0 + i * step
+        for event in tracker.observe(session_id, (score,), now, START + timedelta(seconds=now)):
+            events.append((round(now, 2), event))
+    return events
+
+
+def test_one_frame_blip_is_ignored():
+    tracker = make_tracker()
+
+    assert feed(tracker, 1, [0, 0, 0, 1, 0, 0, 0, 0, 0, 0]) == []
+    assert tracker.active(1) == []
+    assert tracker.stats()["started"] == 0
+
+
+def test_sustained_signal_starts_and_ends_one_episode():
+    tracker = make_tracker()
+
+    events = feed(tracker, 1, [1.0] * 20 + [0.0] * 40)
+    kinds = [(kind, session_id) for _, (kind, session_id, _) in events]
+
+    assert kinds == [("start", 1), ("end", 1)]
+
+    (started_at, (_, _, started)), (ended_at, (_, _, ended)) = events
+    assert started is ended
+    assert started.signal == "no_face"
+    assert started.confidence == 1.0
+    # Starts once the level has held for start_after_seconds
+    assert 0.5 <= started_at < 1.0
+    # The episode's start is when the level first crossed on_threshold
+    assert started.started_at == START
+    assert ended.ended_at is not None and ended.ended_at > started.started_at
+    assert tracker.active(1) == []
+
+
+def test_episode_stays_open_while_signal_holds():
+    tracker = make_tracker()
+
+    events = feed(tracker, 1, [1.0] * 50)
+
+    assert [kind for _, (kind, _, _) in events] == ["start"]
+    assert tracker.active(1) == ["no_face"]
+
+
+def test_sessions_are_tracked_independently():
+    tracker = make_tracker()
+
+    feed(tracker, 1, [1.0] * 10)
+    feed(tracker, 2, [0.0] * 10)
+
+    assert tracker.active(1) == ["no_face"]
+    assert tracker.active(2) == []
+
+
+def test_idle_session_is_pruned_and_its_episode_ended():
+    tracker = make_tracker(idle_ttl_seconds=10)
+
+    feed(tracker, 1, [1.0] * 10)
+    assert tracker.active(1) == ["no_face"]
+
+    # Another session keeps sending frames long after session 1 went quiet
+    events = feed(tracker, 2, [0.0] * 5, t0=30.0)
+
+    assert [(kind, session_id) for _, (kind, session_id, _) in events] == [("end", 1)]
+    _, (_, _, episode) = events[0]
+    # Ended at (roughly) the last frame session 1 sent, not when it was pruned
+    assert episode.ended_at == START + timedelta(seconds=0.9)
+    assert tracker.stats()["sessions"] == 1
+    assert tracker.active(1) == []
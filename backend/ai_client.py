@@ -0,0 +1,59 @@
+import os
+
+import httpx
+
+AI_SERVICE_URL = os.getenv("AI_SERVICE_URL", "http://ai-service:8001")
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "50"))
+AI_HTTP_TIMEOUT = float(os.getenv("AI_HTTP_TIMEOUT", "30"))
+
+# Keep-alive pools shared by every request, so enrollment/verification calls
+# reuse open connections instead of paying TCP setup each time
+_limits = httpx.Limits(
+    max_connections=AI_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=AI_HTTP_MAX_CONNECTIONS
+)
+
+sync_client = httpx.Client(base_url=AI_SERVICE_URL, limits=_limits, timeout=AI_HTTP_TIMEOUT)
+async_client = httpx.AsyncClient(base_url=AI_SERVICE_URL, limits=_limits, timeout=AI_HTTP_TIMEOUT)
+
+
+class AIServiceError(Exception):
+    pass
+
+
+async def generate_embedding(contents):
+    # The embedding for the face in an image, or None if there is no face
+    try:
+        response = await async_client.post(
+            "/generate-embedding",
+            files={"file": ("image.jpg", contents, "image/jpeg")}
+        )
+    except httpx.HTTPError as exc:
+        raise AIServiceError(str(exc))
+
+    if response.status_code != 200:
+        raise AIServiceError(f"AI service returned {response.status_code}")
+
+    return response.json().get("embedding")
+
+
+def generate_embeddings(images):
+    # images: [(filename, bytes)] -> one {"embedding"} or {"error"} per image
+    try:
+        response = sync_client.post(
+            "/generate-embeddings",
+            files=[("files", (name, contents, "application/octet-stream")) for name, contents in images],
+            timeout=120
+        )
+    except httpx.HTTPError as exc:
+        raise AIServiceError(str(exc))
+
+    if response.status_code != 200:
+        raise AIServiceError(f"AI service returned {response.status_code}")
+
+    return response.json()["results"]
+
+
+async def close():
+    await async_client.aclose()
+    sync_client.close()
@@ -1,17 +1,27 @@
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import hashlib
+import heapq
+import os
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
+from typing import Optional
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
+from password_pool import PasswordPoolBusy, password_pool
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
 
 
 def hash_password(password: str):
@@ -22,6 +32,26 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt is deliberately slow: request handlers run it on the password pool
+async def run_password_work(fn, *args):
+    try:
+        return await password_pool.run(fn, *args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
+async def hash_password_async(password: str):
+    return await run_password_work(hash_password, password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await run_password_work(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -29,13 +59,96 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+class TokenCache:
+    """
+    LRU of tokens that already passed jwt.decode, keyed by their SHA-256,
+    so repeat requests skip the signature check. Entries are dropped once
+    the token expires: a heap ordered by expiry hands them out in O(log n),
+    and only when none have expired does the least recently used entry go.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key, user, expires_at, now):
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            heapq.heappush(self._expiry, (expires_at, key))
+
+            # Heap items can be stale (entry evicted or re-put); skip those
+            while self._expiry and self._expiry[0][0] <= now:
+                exp, k = heapq.heappop(self._expiry)
+                entry = self._entries.get(k)
+                if entry is not None and entry[1] == exp:
+                    del self._entries[k]
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            if len(self._expiry) > 2 * self.max_entries:
+                self._expiry = [(exp, k) for k, (_, exp) in self._entries.items()]
+                heapq.heapify(self._expiry)
+
+
+token_cache = TokenCache(max_entries=TOKEN_CACHE_SIZE)
+
+
 def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Resolved user context for the request: {"id", "email", "role"}, taken
+    from the token alone, so routes need no User lookup to know who is calling.
+    """
+    return user_from_token(token)
+
+
+def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None)
+):
+    # EventSource cannot send headers, so streams also accept ?access_token=
+    token = token or access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user_from_token(token)
+
+
+def user_from_token(token: str):
+    now = time.time()
+    key = hashlib.sha256(token.encode()).digest()
+
+    user = token_cache.get(key, now)
+    if user is not None:
+        return user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return {"email": email, "role": role}
     except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    email: str = payload.get("sub")
+    user_id = payload.get("uid")
+    # Tokens issued before the id was added to them have to be renewed
+    if email is None or user_id is None or payload.get("exp") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = {"id": user_id, "email": email, "role": payload.get("role")}
+    token_cache.put(key, user, payload["exp"], now)
+    return user
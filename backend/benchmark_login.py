@@ -0,0 +1,93 @@
+"""
+Login storm: many candidates logging in at once, as at the start of a
+sitting, while a probe keeps hitting a cheap endpoint to show whether the
+rest of the API stays responsive.
+
+    python benchmark_login.py --url http://localhost:8000 --users 500 --concurrency 200
+
+Run once with --register to create the bench accounts first.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+PASSWORD = "bench-password"
+
+
+def percentiles(samples):
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples):8.1f} ms   p99 {p99:8.1f} ms   n={len(samples)}"
+
+
+async def register(client, count):
+    for i in range(count):
+        await client.post("/users/register", json={
+            "name": f"bench {i}",
+            "email": f"bench{i}@bench.test",
+            "password": PASSWORD,
+            "role": "candidate"
+        })
+
+
+async def login(client, i, latencies, statuses):
+    started = time.perf_counter()
+    response = await client.post("/users/login", data={
+        "username": f"bench{i}@bench.test",
+        "password": PASSWORD
+    })
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    if response.status_code == 200:
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def probe(client, latencies, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        if args.register:
+            print(f"Registering {args.users} users")
+            await register(client, args.users)
+
+        login_latencies, probe_latencies, statuses = [], [], {}
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, probe_latencies, stop))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            login(client, i % args.users, login_latencies, statuses)
+            for i in range(args.logins or args.users)
+        ])
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await probe_task
+
+        pool = (await client.get("/metrics/passwords")).json()
+
+    print(f"\n{sum(statuses.values())} logins in {elapsed:.1f}s, status codes {statuses}")
+    print(f"login          {percentiles(login_latencies)}")
+    print(f"GET / (probe)  {percentiles(probe_latencies)}")
+    print(f"password pool  {pool}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=500, help="bench accounts to log in as")
+    parser.add_argument("--logins", type=int, default=0, help="total logins (default: one per user)")
+    parser.add_argument("--concurrency", type=int, default=200, help="max simultaneous connections")
+    parser.add_argument("--register", action="store_true", help="create the bench accounts first")
+    asyncio.run(main(parser.parse_args()))
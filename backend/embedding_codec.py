@@ -0,0 +1,50 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Stored layout: 8-byte header, then `dim` little-endian floats
+#   magic "FE" | version u8 | dtype code u8 | dim u16 | 2 pad bytes
+# The padding keeps the float data 8-byte aligned for np.frombuffer.
+MAGIC = b"FE"
+VERSION = 1
+HEADER = struct.Struct("<2sBBH2x")
+
+DTYPES = {
+    1: np.dtype("<f4"),
+    2: np.dtype("<f2"),
+}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+# float16 halves storage again; ArcFace similarity is unaffected at 3 decimals
+EMBEDDING_STORAGE_DTYPE = np.dtype(os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")).newbyteorder("<")
+
+
+def encode_embedding(embedding, dtype=EMBEDDING_STORAGE_DTYPE):
+    vector = np.asarray(embedding, dtype=dtype)
+    return HEADER.pack(MAGIC, VERSION, DTYPE_CODES[vector.dtype], len(vector)) + vector.tobytes()
+
+
+def decode_embedding(value):
+    """
+    Returns the stored embedding as a NumPy array. Binary values are read
+    in place with np.frombuffer; rows still holding the legacy JSON text
+    (a list, or a json.dumps string) are parsed.
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+
+    if isinstance(value, (bytes, bytearray)):
+        magic, version, dtype_code, dim = HEADER.unpack_from(value)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unrecognised embedding format")
+        return np.frombuffer(value, dtype=DTYPES[dtype_code], count=dim, offset=HEADER.size)
+
+    if isinstance(value, str):
+        value = json.loads(value)
+
+    return np.asarray(value, dtype=np.float32)
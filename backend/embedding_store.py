@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+
+from embedding_codec import decode_embedding
+
+
+def normalize(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+class EmbeddingStore:
+    """
+    In-process cache of enrolled face embeddings, L2-normalized and packed
+    as float32 rows of one matrix, so cosine similarity is one dot product.
+    """
+
+    def __init__(self, dim=512, initial_capacity=1024):
+        self.dim = dim
+        self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._ids = np.full(initial_capacity, -1, dtype=np.int64)
+        self._rows = {}
+        self._free = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+        # Rows written since the last take_changed_rows(), for search indexes
+        self._changed_rows = set()
+
+    def get(self, user_id):
+        row = self._rows.get(user_id)
+        if row is None:
+            return None
+        return self._vectors[row]
+
+    def put(self, user_id, embedding):
+        vector = normalize(embedding)
+
+        with self._lock:
+            row = self._rows.get(user_id)
+
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    if self._size == len(self._vectors):
+                        self._grow()
+                    row = self._size
+                    self._size += 1
+
+            self._vectors[row] = vector
+            self._ids[row] = user_id
+            self._rows[user_id] = row
+            self._changed_rows.add(row)
+
+        return self._vectors[row]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            if row is not None:
+                self._vectors[row] = 0
+                self._ids[row] = -1
+                self._free.append(row)
+                self._changed_rows.add(row)
+
+    def _grow(self):
+        capacity = len(self._vectors) * 2
+
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+
+        self._vectors = vectors
+        self._ids = ids
+
+    def snapshot(self):
+        # (vectors, user_ids) for every used row; free rows have id -1
+        with self._lock:
+            return self._vectors[:self._size], self._ids[:self._size]
+
+    def take_changed_rows(self):
+        with self._lock:
+            changed = self._changed_rows
+            self._changed_rows = set()
+            return changed
+
+    def load(self, user):
+        # Cached vector for an enrolled user, decoding the DB value only on a miss
+        vector = self.get(user.id)
+        if vector is None and user.face_embedding:
+            vector = self.put(user.id, decode_embedding(user.face_embedding))
+        return vector
+
+    def similarity(self, user_id, live_embedding):
+        stored = self.get(user_id)
+        if stored is None:
+            return None
+        return float(stored @ normalize(live_embedding))
+
+    def __len__(self):
+        return len(self._rows)
+
+
+embedding_store = EmbeddingStore()
@@ -0,0 +1,92 @@
+import os
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ai_client
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+ENROLL_IMPORT_BATCH_SIZE = int(os.getenv("ENROLL_IMPORT_BATCH_SIZE", "16"))
+ENROLL_IMPORT_CONCURRENCY = int(os.getenv("ENROLL_IMPORT_CONCURRENCY", "4"))
+
+
+def candidate_key(path):
+    # "photos/1234.jpg" -> ("id", 1234), "jane@uni.edu.png" -> ("email", "jane@uni.edu")
+    stem = os.path.splitext(os.path.basename(path))[0].strip()
+
+    if stem.isdigit():
+        return "id", int(stem)
+    if "@" in stem:
+        return "email", stem.lower()
+    return None
+
+
+def is_photo(path):
+    name = os.path.basename(path)
+    if name.startswith(".") or "__MACOSX" in path:
+        return False
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_archive_photos(fileobj, filename):
+    """
+    Yields (path, bytes) for each photo in a zip or tar archive, reading
+    one member at a time so only the current photo is held in memory.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_photo(info.filename):
+                    yield info.filename, archive.read(info)
+        return
+
+    # "r|*" reads the tar (optionally gz/bz2/xz) as a forward-only stream
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile() and is_photo(member.name):
+                yield member.name, archive.extractfile(member).read()
+
+
+def _embed_batch(batch):
+    try:
+        return ai_client.generate_embeddings(batch)
+    except ai_client.AIServiceError as exc:
+        return [{"error": f"AI service error: {exc}"} for _ in batch]
+
+
+def embed_archive(photos):
+    """
+    Sends photos to the AI service in batches, several batches in flight
+    at once, and returns {path: {"embedding": [...]} or {"error": ...}}.
+    """
+    results = {}
+    in_flight = {}
+
+    def collect(done):
+        for future in done:
+            batch = in_flight.pop(future)
+            for (path, _), result in zip(batch, future.result()):
+                results[path] = result
+
+    with ThreadPoolExecutor(max_workers=ENROLL_IMPORT_CONCURRENCY) as pool:
+        batch = []
+
+        for path, contents in photos:
+            batch.append((path, contents))
+
+            if len(batch) == ENROLL_IMPORT_BATCH_SIZE:
+                # Bound memory: wait for a slot before reading further
+                if len(in_flight) >= ENROLL_IMPORT_CONCURRENCY:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                in_flight[pool.submit(_embed_batch, batch)] = batch
+                batch = []
+
+        if batch:
+            in_flight[pool.submit(_embed_batch, batch)] = batch
+
+        collect(wait(in_flight).done)
+
+    return results
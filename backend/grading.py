@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import update
+
+import models
+from question_cache import question_cache
+
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "256"))
+
+
+class AnswerKey:
+    """
+    An exam's answer key as two aligned arrays: question ids (sorted) and
+    the correct option of each, encoded as small ints. Grading a batch of
+    answers is a searchsorted plus one vector comparison.
+    """
+
+    def __init__(self, question_ids, correct_options):
+        order = np.argsort(np.asarray(question_ids, dtype=np.int64), kind="stable")
+
+        self.options = {option: code for code, option in enumerate(dict.fromkeys(correct_options))}
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)[order]
+        self.correct = np.array(
+            [self.options[option] for option in correct_options], dtype=np.int16
+        )[order]
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def match(self, question_ids, selected):
+        # (in_exam, correct) boolean arrays, one entry per submitted answer
+        ids = np.asarray(question_ids, dtype=np.int64)
+        if not len(self) or not len(ids):
+            empty = np.zeros(len(ids), dtype=bool)
+            return empty, empty
+
+        positions = np.minimum(np.searchsorted(self.question_ids, ids), len(self) - 1)
+        in_exam = self.question_ids[positions] == ids
+
+        codes = np.fromiter(
+            (self.options.get(option, -1) for option in selected), dtype=np.int16, count=len(ids)
+        )
+        return in_exam, in_exam & (self.correct[positions] == codes)
+
+
+def parse_submission(answers):
+    # {"<question_id>": option} -> (ids, options), one answer per question.
+    # Only canonical ids count, as str(question.id) would print them: "01"
+    # or "²" must not answer question 1 a second time.
+    submitted = {}
+    for key, value in answers.items():
+        key = str(key)
+        if not (key.isascii() and key.isdigit()) or key != str(int(key)):
+            continue
+        if isinstance(value, str):
+            submitted.setdefault(int(key), value)
+
+    return list(submitted), list(submitted.values())
+
+
+class AnswerKeyCache:
+    """
+    Answer keys built from the cached question bank, so they follow the
+    same version bumps; a key is rebuilt only when the bank's ETag changes.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db, exam_id):
+        bank = question_cache.get(db, exam_id)
+        etag = bank.questions_etag if bank is not None else None
+
+        with self._lock:
+            cached = self._entries.get(exam_id)
+            if cached is not None and cached[0] == etag:
+                self._entries.move_to_end(exam_id)
+                return cached[1]
+
+        questions = json.loads(bank.questions) if bank is not None else []
+        key = AnswerKey(
+            [q["id"] for q in questions],
+            [q["correct_option"] for q in questions]
+        )
+
+        with self._lock:
+            self._entries[exam_id] = (etag, key)
+            self._entries.move_to_end(exam_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return key
+
+
+answer_keys = AnswerKeyCache(max_entries=ANSWER_KEY_CACHE_SIZE)
+
+
+def regrade_exam(db, exam_id):
+    """
+    Rescores every submitted session of an exam against the current key:
+    one query for the stored answers, one vectorized pass, one bulk update.
+
+    Only sessions with stored answers can be regraded; ones submitted
+    before answers were stored keep their score. Returns (regraded, skipped).
+    """
+    key = answer_keys.get(db, exam_id)
+
+    submitted = db.query(models.ExamSession.id).filter(
+        models.ExamSession.exam_id == exam_id,
+        models.ExamSession.submitted_at.isnot(None)
+    )
+
+    session_ids = np.array([
+        session_id for (session_id,) in submitted.filter(
+            models.ExamSession.id.in_(
+                db.query(models.Answer.session_id).distinct()
+            )
+        ).order_by(models.ExamSession.id)
+    ], dtype=np.int64)
+
+    skipped = submitted.count() - len(session_ids)
+
+    if not len(session_ids):
+        return 0, skipped
+
+    rows = db.query(
+        models.Answer.session_id, models.Answer.question_id, models.Answer.selected_option
+    ).join(
+        models.ExamSession, models.ExamSession.id == models.Answer.session_id
+    ).filter(
+        models.ExamSession.exam_id == exam_id,
+        models.ExamSession.submitted_at.isnot(None)
+    ).all()
+
+    answer_sessions, question_ids, selected = zip(*rows)
+    _, correct = key.match(question_ids, selected)
+    slots = np.searchsorted(session_ids, np.asarray(answer_sessions, dtype=np.int64))
+    scores = np.bincount(slots[correct], minlength=len(session_ids))
+
+    db.execute(update(models.ExamSession), [
+        {"id": int(session_id), "score": int(score), "total_questions": len(key)}
+        for session_id, score in zip(session_ids, scores)
+    ])
+    db.commit()
+
+    return len(session_ids), skipped
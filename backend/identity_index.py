@@ -0,0 +1,145 @@
+import os
+import threading
+
+import numpy as np
+
+import models
+from embedding_codec import decode_embedding
+from embedding_store import embedding_store, normalize
+
+# Same bar verify-face uses to accept a face as a given candidate
+IDENTITY_MATCH_THRESHOLD = float(os.getenv("IDENTITY_MATCH_THRESHOLD", "0.6"))
+
+# "flat" (exact brute force), "ivf" (partitioned) or "auto" (ivf past IVF_MIN_SIZE)
+IDENTITY_INDEX_MODE = os.getenv("IDENTITY_INDEX_MODE", "auto")
+IVF_MIN_SIZE = int(os.getenv("IVF_MIN_SIZE", "50000"))
+IVF_PROBES = int(os.getenv("IVF_PROBES", "8"))
+
+
+def kmeans(vectors, k, iterations=10, seed=0):
+    # Spherical k-means: vectors and centroids are unit length, assign by dot product
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assignment == c]
+            if len(members):
+                centroids[c] = normalize(members.sum(axis=0))
+
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class IdentityIndex:
+    """
+    1:N face search over every enrolled candidate in the embedding store.
+
+    Flat mode scores the query against the whole matrix in one matmul. IVF
+    mode clusters the rows into ~sqrt(N) partitions and only scores the
+    `probes` partitions nearest the query, plus rows enrolled since the
+    partitions were built; it rebuilds once those exceed 10% of the index.
+    """
+
+    def __init__(self, store, mode="auto", ivf_min_size=50000, probes=8):
+        self.store = store
+        self.mode = mode
+        self.ivf_min_size = ivf_min_size
+        self.probes = probes
+
+        self._loaded = False
+        self._centroids = None
+        self._lists = None
+        self._pending_rows = set()
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, db):
+        # Pull every enrolled embedding into the store once per process
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            rows = db.query(models.User.id, models.User.face_embedding).filter(
+                models.User.face_enrolled.is_(True),
+                models.User.face_embedding.isnot(None)
+            ).yield_per(1000)
+
+            for user_id, face_embedding in rows:
+                if self.store.get(user_id) is None:
+                    self.store.put(user_id, decode_embedding(face_embedding))
+
+            self._loaded = True
+
+    def _use_ivf(self, size):
+        if self.mode == "ivf":
+            return size >= self.probes
+        return self.mode == "auto" and size >= self.ivf_min_size
+
+    def _build_ivf(self, vectors, ids):
+        used = np.flatnonzero(ids >= 0)
+        k = min(len(used), max(self.probes, int(np.sqrt(len(used)))))
+
+        centroids, assignment = kmeans(vectors[used], k)
+
+        self._centroids = centroids
+        self._lists = [used[assignment == c] for c in range(k)]
+        self._pending_rows = set()
+
+    def _candidate_rows(self, vectors, ids, query):
+        with self._lock:
+            self._pending_rows |= self.store.take_changed_rows()
+
+            if self._centroids is None or len(self._pending_rows) > 0.1 * len(vectors):
+                self._build_ivf(vectors, ids)
+
+            nearest = np.argsort(self._centroids @ query)[-self.probes:]
+            rows = np.concatenate([self._lists[c] for c in nearest])
+            if self._pending_rows:
+                rows = np.concatenate([rows, np.fromiter(self._pending_rows, dtype=np.int64)])
+
+        # Rows enrolled after the build may be beyond this snapshot
+        rows = np.unique(rows)
+        return rows[rows < len(vectors)]
+
+    def search(self, embedding, top_k=5, threshold=IDENTITY_MATCH_THRESHOLD, exclude_user_id=None):
+        vectors, ids = self.store.snapshot()
+        if not (ids >= 0).any():
+            return []
+
+        query = normalize(embedding)
+
+        if self._use_ivf(len(vectors)):
+            rows = self._candidate_rows(vectors, ids, query)
+            scores = vectors[rows] @ query
+            candidate_ids = ids[rows]
+        else:
+            scores = vectors @ query
+            candidate_ids = ids
+
+        keep = (candidate_ids >= 0) & (scores >= threshold)
+        if exclude_user_id is not None:
+            keep &= candidate_ids != exclude_user_id
+
+        scores = scores[keep]
+        candidate_ids = candidate_ids[keep]
+
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+            scores, candidate_ids = scores[top], candidate_ids[top]
+
+        order = np.argsort(-scores)
+        return [
+            {"user_id": int(candidate_ids[i]), "similarity": float(scores[i])}
+            for i in order
+        ]
+
+
+identity_index = IdentityIndex(
+    embedding_store,
+    mode=IDENTITY_INDEX_MODE,
+    ivf_min_size=IVF_MIN_SIZE,
+    probes=IVF_PROBES
+)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import deque
+
+from fastapi.encoders import jsonable_encoder
+
+LIVE_EVENT_BUFFER = int(os.getenv("LIVE_EVENT_BUFFER", "10000"))
+LIVE_SUBSCRIBER_QUEUE = int(os.getenv("LIVE_SUBSCRIBER_QUEUE", "1000"))
+
+
+class LiveEvent:
+    __slots__ = ("id", "seq", "type", "exam_id", "data")
+
+    def __init__(self, epoch, seq, type, exam_id, data):
+        self.id = f"{epoch}-{seq}"
+        self.seq = seq
+        self.type = type
+        self.exam_id = exam_id
+        self.data = data
+
+    def format(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Set when the subscriber fell too far behind; its stream ends once
+        # drained and the client resumes from its last event id
+        self.closed = False
+
+
+class EventBus:
+    """
+    In-process pub/sub behind the admin live feed.
+
+    Event ids are "<epoch>-<seq>": the epoch changes on every restart, so a
+    client resuming with an id from before the restart, or from before the
+    oldest buffered event, is told to resync instead of silently missing
+    events. Publishing is safe from any thread.
+    """
+
+    def __init__(self, buffer_size=10000, queue_size=1000):
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+
+        self.published = 0
+        self.overflowed = 0
+
+        self._seq = 0
+        self._events = deque(maxlen=buffer_size)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, type, exam_id, data):
+        payload = json.dumps(jsonable_encoder(data))
+
+        with self._lock:
+            self._seq += 1
+            event = LiveEvent(self.epoch, self._seq, type, exam_id, payload)
+            self._events.append(event)
+            self.published += 1
+            subscribers = list(self._subscribers.items())
+
+        for subscription, loop in subscribers:
+            loop.call_soon_threadsafe(self._deliver, subscription, event)
+
+    def _deliver(self, subscription, event):
+        if subscription.closed:
+            return
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            subscription.closed = True
+            self.overflowed += 1
+            self.unsubscribe(subscription)
+
+    def _since(self, last_event_id):
+        # (buffered events after last_event_id, whether nothing was missed)
+        if not last_event_id:
+            return [], True
+
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return list(self._events), False
+
+        seq = int(seq)
+        oldest = self._events[0].seq if self._events else self._seq + 1
+        complete = seq >= oldest - 1
+        return [event for event in self._events if event.seq > seq], complete
+
+    def subscribe(self, last_event_id=None):
+        """
+        Returns (subscription, backlog, complete). Registering and reading
+        the backlog happen under one lock, so no event is missed or repeated
+        between the two.
+        """
+        subscription = Subscription(self.queue_size)
+
+        with self._lock:
+            backlog, complete = self._since(last_event_id)
+            self._subscribers[subscription] = asyncio.get_running_loop()
+
+        return subscription, backlog, complete
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.pop(subscription, None)
+
+    def stats(self):
+        return {
+            "epoch": self.epoch,
+            "published": self.published,
+            "buffered": len(self._events),
+            "subscribers": len(self._subscribers),
+            "overflowed": self.overflowed
+        }
+
+
+event_bus = EventBus(buffer_size=LIVE_EVENT_BUFFER, queue_size=LIVE_SUBSCRIBER_QUEUE)
@@ -1,14 +1,15 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from database import engine
-from models import Base
+from database import async_engine
 from routers import user
 from routers import exam
 from routers import session
 from routers import admin
+import ai_client
+from password_pool import password_pool
 
+# Schema is managed by Alembic: `alembic upgrade head` runs before the server starts
 app = FastAPI()
-Base.metadata.create_all(bind=engine)
 
 app.mount("/evidence", StaticFiles(directory="evidence"), name="evidence")
 
@@ -17,6 +18,19 @@ app.include_router(exam.router)
 app.include_router(session.router)
 app.include_router(admin.router)
 
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ai_client.close()
+    await async_engine.dispose()
+    password_pool.shutdown()
+
+
 @app.get("/")
 def root():
     return {"message": "AI Remote Proctoring Backend Running"}
+
+
+@app.get("/metrics/passwords")
+def password_metrics():
+    return password_pool.stats()
@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, inspect, pool
+
+from database import DATABASE_URL
+import models
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+# Schema created by Base.metadata.create_all before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"}
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        tables = inspect(connection).get_table_names()
+
+        context.configure(connection=connection, target_metadata=target_metadata)
+
+        with context.begin_transaction():
+            if "users" in tables and "alembic_version" not in tables:
+                # Pre-migration database: adopt it at the baseline instead of
+                # failing on "relation users already exists"
+                context.get_context().stamp(context.script, BASELINE_REVISION)
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,118 @@
+"""baseline schema, as created by Base.metadata.create_all
+
+Databases created before migrations were introduced already have this
+schema; migrations/env.py stamps them at 0001 on the first upgrade.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("password", sa.String()),
+        sa.Column("role", sa.String()),
+        sa.Column("face_embedding", sa.JSON(), nullable=True),
+        sa.Column("face_enrolled", sa.Boolean()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "exams",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("duration_minutes", sa.Integer()),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_exams_id", "exams", ["id"])
+
+    op.create_table(
+        "exam_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("exam_id", sa.Integer(), sa.ForeignKey("exams.id")),
+        sa.Column("status", sa.String()),
+        sa.Column("warning_count", sa.Integer()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("ended_at", sa.DateTime(), nullable=True),
+        sa.Column("score", sa.Integer()),
+        sa.Column("total_questions", sa.Integer()),
+        sa.Column("submitted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_exam_sessions_id", "exam_sessions", ["id"])
+
+    op.create_table(
+        "violations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("exam_sessions.id")),
+        sa.Column("type", sa.String()),
+        sa.Column("severity", sa.String()),
+        sa.Column("evidence_url", sa.String(), nullable=True),
+        sa.Column("confidence", sa.Float()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_violations_id", "violations", ["id"])
+
+    op.create_table(
+        "face_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+        sa.Column("embedding", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "identity_verification_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("exam_id", sa.Integer()),
+        sa.Column("similarity_score", sa.Float()),
+        sa.Column("success", sa.Boolean()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_identity_verification_logs_id", "identity_verification_logs", ["id"])
+
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("exam_id", sa.Integer(), sa.ForeignKey("exams.id")),
+        sa.Column("subject", sa.String()),
+        sa.Column("question_text", sa.Text()),
+        sa.Column("option_a", sa.String()),
+        sa.Column("option_b", sa.String()),
+        sa.Column("option_c", sa.String()),
+        sa.Column("option_d", sa.String()),
+        sa.Column("correct_option", sa.String()),
+    )
+    op.create_index("ix_questions_id", "questions", ["id"])
+
+    op.create_table(
+        "answers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("exam_sessions.id")),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id")),
+        sa.Column("selected_option", sa.String()),
+    )
+    op.create_index("ix_answers_id", "answers", ["id"])
+
+
+def downgrade():
+    for table in (
+        "answers", "questions", "identity_verification_logs", "face_templates",
+        "violations", "exam_sessions", "exams", "users"
+    ):
+        op.drop_table(table)
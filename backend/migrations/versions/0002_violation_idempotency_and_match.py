@@ -0,0 +1,30 @@
+"""violation idempotency keys and impersonation matches
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("violations", sa.Column("idempotency_key", sa.String(), nullable=True))
+    op.create_unique_constraint("violations_idempotency_key_key", "violations", ["idempotency_key"])
+
+    op.add_column(
+        "identity_verification_logs",
+        sa.Column("matched_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("identity_verification_logs", "matched_user_id")
+    op.drop_constraint("violations_idempotency_key_key", "violations", type_="unique")
+    op.drop_column("violations", "idempotency_key")
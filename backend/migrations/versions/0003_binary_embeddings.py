@@ -0,0 +1,78 @@
+"""store face embeddings as binary, see embedding_codec
+
+Converts users.face_embedding (JSON) and face_templates.embedding (String)
+in place; supersedes the old migrate_embeddings.py script. Columns that are
+already binary, because that script was run, are left alone.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+from embedding_codec import decode_embedding, encode_embedding
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("users", "face_embedding", sa.JSON()),
+    ("face_templates", "embedding", sa.String()),
+]
+
+BATCH_SIZE = 1000
+
+
+def column_type(conn, table, column):
+    for info in sa.inspect(conn).get_columns(table):
+        if info["name"] == column:
+            return info["type"]
+    return None
+
+
+def convert_column(conn, table, column, new_type, convert):
+    tmp_column = f"{column}_new"
+
+    op.add_column(table, sa.Column(tmp_column, new_type, nullable=True))
+
+    rows = conn.execute(sa.text(
+        f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL"
+    )).fetchall()
+
+    update = sa.text(f"UPDATE {table} SET {tmp_column} = :value WHERE id = :id")
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(update, [
+            {"id": row_id, "value": convert(value)}
+            for row_id, value in rows[start:start + BATCH_SIZE]
+        ])
+
+    op.drop_column(table, column)
+    op.alter_column(table, tmp_column, new_column_name=column)
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    for table, column, _ in COLUMNS:
+        if isinstance(column_type(conn, table, column), sa.LargeBinary):
+            continue
+        convert_column(
+            conn, table, column, sa.LargeBinary(),
+            lambda value: encode_embedding(decode_embedding(value))
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+
+    for table, column, old_type in COLUMNS:
+        convert_column(
+            conn, table, column, old_type,
+            lambda value: json.dumps(decode_embedding(value).tolist())
+        )
@@ -0,0 +1,36 @@
+"""indexes for the hot lookup paths
+
+start_exam / validate_session read the latest verification per
+(user_id, exam_id); admin listings page sessions by status and violations
+by session; question loading filters on exam_id.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_exam_sessions_user_id_status", "exam_sessions", ["user_id", "status"]),
+    ("ix_exam_sessions_status_id", "exam_sessions", ["status", "id"]),
+    ("ix_exam_sessions_exam_id_status_id", "exam_sessions", ["exam_id", "status", "id"]),
+    ("ix_violations_session_id_id", "violations", ["session_id", "id"]),
+    ("ix_identity_verification_logs_user_exam_ts", "identity_verification_logs", ["user_id", "exam_id", "timestamp"]),
+    ("ix_questions_exam_id", "questions", ["exam_id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,21 @@
+"""index answers by session, for submission and exam regrading
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_answers_session_id", "answers", ["session_id"])
+
+
+def downgrade():
+    op.drop_index("ix_answers_session_id", table_name="answers")
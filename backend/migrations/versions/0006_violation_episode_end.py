@@ -0,0 +1,22 @@
+"""end time of sustained violation episodes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("violations", sa.Column("ended_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("violations", "ended_at")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from sqlalchemy import DateTime
@@ -13,7 +13,7 @@ class User(Base):
     password = Column(String)
     role = Column(String)  # admin or candidate
 
-    face_embedding = Column(JSON, nullable=True)
+    face_embedding = Column(LargeBinary, nullable=True)  # see embedding_codec
     face_enrolled = Column(Boolean, default=False)
 
 
@@ -39,6 +39,14 @@ class ExamSession(Base):
     total_questions = Column(Integer, default=0)
     submitted_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # A candidate's sessions, optionally by status
+        Index("ix_exam_sessions_user_id_status", "user_id", "status"),
+        # Admin listings: active sessions paged by id, optionally per exam
+        Index("ix_exam_sessions_status_id", "status", "id"),
+        Index("ix_exam_sessions_exam_id_status_id", "exam_id", "status", "id"),
+    )
+
 class Violation(Base):
     __tablename__ = "violations"
 
@@ -49,13 +57,21 @@ class Violation(Base):
     evidence_url = Column(String, nullable=True)
     confidence = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Set when the reporter closes a sustained episode (e.g. face absent from..to)
+    ended_at = Column(DateTime, nullable=True)
+    idempotency_key = Column(String, unique=True, nullable=True)
+
+    __table_args__ = (
+        # A session's violations paged by id
+        Index("ix_violations_session_id_id", "session_id", "id"),
+    )
 
 class FaceTemplate(Base):
     __tablename__ = "face_templates"
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True)
-    embedding = Column(String)  # store JSON string
+    embedding = Column(LargeBinary)  # see embedding_codec
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class IdentityVerificationLog(Base):
@@ -66,14 +82,21 @@ class IdentityVerificationLog(Base):
     exam_id = Column(Integer)
     similarity_score = Column(Float)
     success = Column(Boolean)
+    # Another enrolled candidate the live face matched, if any
+    matched_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Latest verification for (candidate, exam), read on every session check
+        Index("ix_identity_verification_logs_user_exam_ts", "user_id", "exam_id", "timestamp"),
+    )
+
 
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    exam_id = Column(Integer, ForeignKey("exams.id"))
+    exam_id = Column(Integer, ForeignKey("exams.id"), index=True)
     subject = Column(String)
     question_text = Column(Text)
     option_a = Column(String)
@@ -87,6 +110,6 @@ class Answer(Base):
     __tablename__ = "answers"
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("exam_sessions.id"))
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"), index=True)
     question_id = Column(Integer, ForeignKey("questions.id"))
     selected_option = Column(String)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "64"))
+
+# Token bucket in front of the queue: sustained hashes/sec and burst size
+PASSWORD_RATE = float(os.getenv("PASSWORD_RATE", "50"))
+PASSWORD_BURST = int(os.getenv("PASSWORD_BURST", "100"))
+
+
+class PasswordPoolBusy(Exception):
+    def __init__(self, reason):
+        super().__init__(f"password pool busy: {reason}")
+        self.reason = reason
+
+
+class PasswordPool:
+    """
+    Dedicated threads for bcrypt, so a login storm queues here instead of
+    occupying the server threadpool every other endpoint runs on.
+
+    A call is admitted only if the token bucket has a token and fewer than
+    `workers + max_queue` calls are in flight; otherwise it is rejected with
+    PasswordPoolBusy straight away.
+    """
+
+    def __init__(self, workers=4, max_queue=64, rate=50.0, burst=100):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.rate = rate
+        self.burst = burst
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected_rate = 0
+        self.rejected_queue = 0
+        self.max_queue_depth = 0
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._waits = deque(maxlen=1024)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-worker")
+
+    def _admit(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+
+            if self.pending >= self.max_pending:
+                self.rejected_queue += 1
+                raise PasswordPoolBusy("queue full")
+            if self._tokens < 1:
+                self.rejected_rate += 1
+                raise PasswordPoolBusy("rate limited")
+
+            self._tokens -= 1
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending - self.workers)
+
+    async def run(self, fn, *args):
+        self._admit()
+        submitted = time.perf_counter()
+
+        def call():
+            self._waits.append((time.perf_counter() - submitted) * 1000)
+            return fn(*args)
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(call))
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self):
+        waits = sorted(self._waits)
+
+        def percentile(q):
+            return round(waits[min(len(waits) - 1, int(len(waits) * q))], 2) if waits else None
+
+        return {
+            "workers": self.workers,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.workers),
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected_rate": self.rejected_rate,
+            "rejected_queue": self.rejected_queue,
+            "queue_wait_ms_p50": percentile(0.5),
+            "queue_wait_ms_p99": percentile(0.99)
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool(
+    workers=PASSWORD_WORKERS,
+    max_queue=PASSWORD_MAX_QUEUE,
+    rate=PASSWORD_RATE,
+    burst=PASSWORD_BURST
+)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import redis
+from fastapi import Response
+
+import models
+
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "256"))
+QUESTION_CACHE_TTL_SECONDS = int(os.getenv("QUESTION_CACHE_TTL_SECONDS", "3600"))
+
+# Optional shared tier: with several workers, versions and payloads live in Redis
+REDIS_URL = os.getenv("REDIS_URL")
+
+QUESTION_FIELDS = [
+    "id", "exam_id", "subject", "question_text",
+    "option_a", "option_b", "option_c", "option_d", "correct_option"
+]
+
+
+def etag_for(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class QuestionBank:
+    """
+    Serialized question payloads for one exam version, ready to send as-is:
+    `questions` is the bare list, `exam` adds the exam duration.
+    """
+
+    __slots__ = ("questions", "questions_etag", "exam", "exam_etag")
+
+    def __init__(self, duration, questions):
+        self.questions = questions
+        self.questions_etag = etag_for(questions)
+        self.exam = b'{"duration":' + json.dumps(duration).encode() + b',"questions":' + questions + b"}"
+        self.exam_etag = etag_for(self.exam)
+
+
+class QuestionCache:
+    """
+    Read-through cache of question banks keyed by (exam_id, version).
+
+    add_question bumps the exam's version, so stale entries are never read
+    again and simply age out of the LRU. Concurrent misses for the same exam
+    (everyone opening the paper at once) wait for a single database load.
+    """
+
+    def __init__(self, max_entries=256, redis_url=None, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url else None
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def version(self, exam_id):
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(f"questions:{exam_id}:version") or 0)
+            except redis.RedisError:
+                pass
+        return self._versions.get(exam_id, 0)
+
+    def invalidate(self, exam_id):
+        with self._lock:
+            self._versions[exam_id] = self._versions.get(exam_id, 0) + 1
+
+        if self.redis is not None:
+            try:
+                self.redis.incr(f"questions:{exam_id}:version")
+            except redis.RedisError:
+                pass
+
+    def get(self, db, exam_id):
+        # QuestionBank for the exam, or None if the exam does not exist
+        key = (exam_id, self.version(exam_id))
+
+        bank = self._cached(key)
+        if bank is not None:
+            return bank
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            bank = self._cached(key)
+            if bank is None:
+                bank = self._from_redis(key)
+                if bank is None:
+                    bank = self._load(db, key)
+                if bank is not None:
+                    self._store(key, bank)
+
+        with self._lock:
+            self._loading.pop(key, None)
+
+        return bank
+
+    def _cached(self, key):
+        with self._lock:
+            bank = self._entries.get(key)
+            if bank is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return bank
+
+    def _store(self, key, bank):
+        with self._lock:
+            self._entries[key] = bank
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _from_redis(self, key):
+        if self.redis is None:
+            return None
+
+        try:
+            stored = self.redis.hgetall(f"questions:{key[0]}:v{key[1]}")
+        except redis.RedisError:
+            return None
+
+        if not stored:
+            return None
+
+        self.redis_hits += 1
+        return QuestionBank(json.loads(stored[b"duration"]), stored[b"questions"])
+
+    def _load(self, db, key):
+        exam_id = key[0]
+        self.misses += 1
+
+        exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
+        if exam is None:
+            return None
+
+        rows = db.query(*[getattr(models.Question, f) for f in QUESTION_FIELDS]).filter(
+            models.Question.exam_id == exam_id
+        ).order_by(models.Question.id).all()
+
+        questions = json.dumps(
+            [dict(zip(QUESTION_FIELDS, row)) for row in rows], separators=(",", ":")
+        ).encode()
+        bank = QuestionBank(exam.duration_minutes, questions)
+
+        if self.redis is not None:
+            redis_key = f"questions:{exam_id}:v{key[1]}"
+            try:
+                with self.redis.pipeline() as pipe:
+                    pipe.hset(redis_key, mapping={
+                        "duration": json.dumps(exam.duration_minutes),
+                        "questions": questions
+                    })
+                    pipe.expire(redis_key, self.ttl_seconds)
+                    pipe.execute()
+            except redis.RedisError:
+                pass
+
+        return bank
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses
+        }
+
+
+def cached_response(body, etag, if_none_match):
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    tags = [tag.strip().removeprefix("W/") for tag in (if_none_match or "").split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+question_cache = QuestionCache(
+    max_entries=QUESTION_CACHE_SIZE,
+    redis_url=REDIS_URL,
+    ttl_seconds=QUESTION_CACHE_TTL_SECONDS
+)
@@ -1,21 +1,123 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
-import models
-from auth import get_current_user
-import requests
+from database import SessionLocal, get_db, get_async_db
+from datetime import datetime
+from typing import Optional
+import asyncio
+import csv
+import io
 import json
+import models
+from auth import get_current_user, get_stream_user
+import ai_client
+import tarfile
+import zipfile
 import numpy as np
 import schemas
+from embedding_codec import encode_embedding
+from embedding_store import embedding_store, normalize
+from identity_index import IDENTITY_MATCH_THRESHOLD, identity_index
+from question_cache import question_cache
+from grading import regrade_exam
+from live_events import event_bus
+from enrollment_import import candidate_key, embed_archive, iter_archive_photos
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+MAX_PAGE_SIZE = 1000
+
+# Matches listed per enrolled face under "possible_duplicates"
+DUPLICATE_TOP_K = 5
+
+# Comment line sent on idle streams so proxies keep the connection open
+LIVE_KEEPALIVE_SECONDS = 15
+
+
+def keyset_page(query, id_column, after_id, limit, response, row_id=lambda row: row.id):
+    # Rows with id > after_id in id order; the next cursor goes in X-Next-Cursor
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+
+    rows = query.order_by(id_column).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(row_id(rows[-1]))
+
+    return rows
+
+
+def session_row(s, email):
+    return {
+        "session_id": s.id,
+        "candidate_email": email,
+        "exam_id": s.exam_id,
+        "status": s.status,
+        "warnings": s.warning_count,
+        "started_at": s.started_at,
+        "ended_at": s.ended_at
+    }
+
+
+def filtered_sessions(db, exam_id, status, started_after, started_before):
+    # Sessions joined to their candidate's email: one query, no per-row lookups
+    query = db.query(models.ExamSession, models.User.email).outerjoin(
+        models.User, models.User.id == models.ExamSession.user_id
+    )
+
+    if exam_id is not None:
+        query = query.filter(models.ExamSession.exam_id == exam_id)
+    if status is not None:
+        query = query.filter(models.ExamSession.status == status)
+    if started_after is not None:
+        query = query.filter(models.ExamSession.started_at >= started_after)
+    if started_before is not None:
+        query = query.filter(models.ExamSession.started_at < started_before)
+
+    return query
+
+
+def export_sessions(export_format, filters):
+    # Streams every matching session; uses its own DB session because the
+    # request's one is closed before a streaming body is sent
+    def rows():
+        db = SessionLocal()
+        try:
+            query = filtered_sessions(db, **filters).order_by(models.ExamSession.id)
+            for s, email in query.yield_per(1000):
+                yield session_row(s, email)
+        finally:
+            db.close()
+
+    if export_format == "ndjson":
+        def ndjson():
+            for row in rows():
+                yield json.dumps(jsonable_encoder(row)) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    def csv_lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["session_id", "candidate_email", "exam_id", "status", "warnings", "started_at", "ended_at"])
+
+        for row in rows():
+            writer.writerow(row.values())
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        yield buffer.getvalue()
+
+    return StreamingResponse(
+        csv_lines(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=sessions.csv"}
+    )
 
 
 # ==================
@@ -23,28 +125,37 @@ def get_db():
 # ======================
 @router.get("/sessions")
 def get_all_sessions(
+    response: Response,
+    exam_id: Optional[int] = None,
+    status: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    sessions = db.query(models.ExamSession).all()
+    filters = {
+        "exam_id": exam_id,
+        "status": status,
+        "started_after": started_after,
+        "started_before": started_before
+    }
 
-    result = []
-    for s in sessions:
-        user = db.query(models.User).filter(models.User.id == s.user_id).first()
+    if format != "json":
+        return export_sessions(format, filters)
 
-        result.append({
-            "session_id": s.id,
-            "candidate_email": user.email if user else None,
-            "status": s.status,
-            "warnings": s.warning_count,
-            "started_at": s.started_at,
-            "ended_at": s.ended_at
-        })
+    rows = keyset_page(
+        filtered_sessions(db, **filters),
+        models.ExamSession.id, after_id, limit, response,
+        row_id=lambda row: row[0].id
+    )
 
-    return result
+    return [session_row(s, email) for s, email in rows]
 
 
 # ==========================================
@@ -52,15 +163,24 @@ def get_all_sessions(
 # ==========================================
 @router.get("/sessions/active")
 def get_active_sessions(
+    response: Response,
+    exam_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    sessions = db.query(models.ExamSession).filter(
+    query = db.query(models.ExamSession).filter(
         models.ExamSession.status == "active"
-    ).all()
+    )
+
+    if exam_id is not None:
+        query = query.filter(models.ExamSession.exam_id == exam_id)
+
+    sessions = keyset_page(query, models.ExamSession.id, after_id, limit, response)
 
     result = []
     for s in sessions:
@@ -80,29 +200,99 @@ def get_active_sessions(
 @router.get("/sessions/{session_id}/violations")
 def get_session_violations(
     session_id: int,
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    violations = db.query(models.Violation).filter(
-        models.Violation.session_id == session_id
-    ).all()
+    violations = keyset_page(
+        db.query(models.Violation).filter(models.Violation.session_id == session_id),
+        models.Violation.id, after_id, limit, response
+    )
 
     result = []
     for v in violations:
         result.append({
+            "id": v.id,
             "type": v.type,
             "severity": v.severity,
             "confidence": v.confidence,
             "evidence_url": f"http://localhost:8000/{v.evidence_url}" if v.evidence_url else None,
-            "timestamp": v.timestamp
+            "timestamp": v.timestamp,
+            "ended_at": v.ended_at
         })
 
     return result
 
 
+# ==========================================
+# Live Feed (Server-Sent Events)
+# ==========================================
+@router.get("/events")
+async def live_events(
+    request: Request,
+    exam_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_stream_user)
+):
+    """
+    Pushes session_started, violation, session_terminated and
+    session_completed events as they happen. Reconnecting clients send
+    Last-Event-ID and get what they missed; a `resync` event means the gap
+    could not be filled and the listings should be re-fetched once.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    def wanted(event):
+        return exam_id is None or event.exam_id == exam_id
+
+    async def stream():
+        subscription, backlog, complete = event_bus.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+
+            if not complete:
+                yield "event: resync\ndata: {}\n\n"
+
+            for event in backlog:
+                if wanted(event):
+                    yield event.format()
+
+            while not (subscription.closed and subscription.queue.empty()):
+                if await request.is_disconnected():
+                    break
+
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if wanted(event):
+                    yield event.format()
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/events/stats")
+def live_event_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return event_bus.stats()
+
+
 # ==========================================
 # Enroll Candidate Face (Admin Only)
 # ==========================================
@@ -111,14 +301,12 @@ async def enroll_candidate_face(
     candidate_id: int,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
 
-    candidate = db.query(models.User).filter(
-        models.User.id == candidate_id
-    ).first()
+    candidate = await db.get(models.User, candidate_id)
 
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
@@ -126,26 +314,192 @@ async def enroll_candidate_face(
     contents = await file.read()
 
     # Send image to AI service
-    response = requests.post(
-        "http://ai-service:8001/generate-embedding",
-        files={"file": contents}
-    )
-
-    if response.status_code != 200:
+    try:
+        embedding = await ai_client.generate_embedding(contents)
+    except ai_client.AIServiceError:
         raise HTTPException(400, "Face detection failed")
 
-    embedding = response.json().get("embedding")
-
     if not embedding:
         raise HTTPException(400, "No face detected")
 
+    # Flag faces that already belong to another enrolled candidate
+    await db.run_sync(identity_index.ensure_loaded)
+    duplicates = identity_index.search(embedding, exclude_user_id=candidate.id)
+
     # Store embedding
-    candidate.face_embedding = json.dumps(embedding)
+    candidate.face_embedding = encode_embedding(embedding)
     candidate.face_enrolled = True
 
+    await db.commit()
+
+    embedding_store.put(candidate.id, embedding)
+
+    return {
+        "message": "Face enrolled successfully",
+        "possible_duplicates": await db.run_sync(with_emails, duplicates)
+    }
+
+
+# ==========================================
+# Bulk Enroll a Cohort from an Archive (Admin Only)
+# ==========================================
+@router.post("/enroll-candidates/bulk")
+def enroll_candidates_bulk(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Photos are named by candidate id or email, e.g. 1234.jpg or jane@uni.edu.jpg
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    report = {}
+    keyed = {}
+
+    def photos():
+        for path, contents in iter_archive_photos(file.file, file.filename or ""):
+            key = candidate_key(path)
+            if key is None:
+                report[path] = {"file": path, "status": "error", "detail": "File name is not a candidate id or email"}
+                continue
+            keyed[path] = key
+            yield path, contents
+
+    try:
+        embeddings = embed_archive(photos())
+    except (zipfile.BadZipFile, tarfile.TarError):
+        raise HTTPException(status_code=400, detail="Upload a .zip or .tar(.gz) archive")
+
+    # Resolve every candidate in two queries
+    ids = [value for kind, value in keyed.values() if kind == "id"]
+    emails = [value for kind, value in keyed.values() if kind == "email"]
+
+    candidates = {}
+    if ids:
+        for user in db.query(models.User).filter(models.User.id.in_(ids)):
+            candidates[("id", user.id)] = user
+    if emails:
+        for user in db.query(models.User).filter(models.User.email.in_(emails)):
+            candidates[("email", user.email.lower())] = user
+
+    identity_index.ensure_loaded(db)
+    enrolled = {}
+
+    # path -> {user_id: similarity}. Faces accepted earlier in this archive
+    # only reach the index after the commit, so they are compared here too.
+    duplicates = {}
+    batch_paths = []
+    batch_ids = []
+    batch_vectors = np.zeros((len(keyed), embedding_store.dim), dtype=np.float32)
+
+    for path, key in keyed.items():
+        candidate = candidates.get(key)
+        result = embeddings.get(path, {"error": "Not processed"})
+
+        if candidate is None:
+            report[path] = {"file": path, "status": "error", "detail": "Candidate not found"}
+        elif "error" in result:
+            report[path] = {"file": path, "candidate_id": candidate.id, "status": "error", "detail": result["error"]}
+        else:
+            candidate.face_embedding = encode_embedding(result["embedding"])
+            candidate.face_enrolled = True
+            enrolled[candidate.id] = result["embedding"]
+
+            matches = {
+                m["user_id"]: m["similarity"]
+                for m in identity_index.search(
+                    result["embedding"], top_k=DUPLICATE_TOP_K, exclude_user_id=candidate.id
+                )
+            }
+
+            vector = normalize(result["embedding"])
+            scores = batch_vectors[:len(batch_ids)] @ vector
+
+            for i in np.flatnonzero(scores >= IDENTITY_MATCH_THRESHOLD):
+                other_id = batch_ids[i]
+                if other_id == candidate.id:
+                    continue
+
+                # Flag the pair both ways, as if each had been enrolled second
+                similarity = float(scores[i])
+                matches[other_id] = max(similarity, matches.get(other_id, similarity))
+                earlier = duplicates[batch_paths[i]]
+                earlier[candidate.id] = max(similarity, earlier.get(candidate.id, similarity))
+
+            batch_vectors[len(batch_ids)] = vector
+            batch_paths.append(path)
+            batch_ids.append(candidate.id)
+            duplicates[path] = matches
+
+            report[path] = {"file": path, "candidate_id": candidate.id, "status": "enrolled"}
+
+    # All embeddings land in one transaction
     db.commit()
 
-    return {"message": "Face enrolled successfully"}
+    for candidate_id, embedding in enrolled.items():
+        embedding_store.put(candidate_id, embedding)
+
+    # Same shape as single enrollment, with every email fetched in one query
+    emails = emails_by_id(db, {user_id for matches in duplicates.values() for user_id in matches})
+
+    for path, matches in duplicates.items():
+        ranked = sorted(matches.items(), key=lambda m: -m[1])[:DUPLICATE_TOP_K]
+        report[path]["possible_duplicates"] = [
+            {"user_id": user_id, "similarity": similarity, "email": emails.get(user_id)}
+            for user_id, similarity in ranked
+        ]
+
+    results = list(report.values())
+    succeeded = sum(1 for r in results if r["status"] == "enrolled")
+
+    return {
+        "enrolled": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+def emails_by_id(db, user_ids):
+    if not user_ids:
+        return {}
+
+    return dict(db.query(models.User.id, models.User.email).filter(
+        models.User.id.in_(list(user_ids))
+    ).all())
+
+
+def with_emails(db, matches):
+    emails = emails_by_id(db, [m["user_id"] for m in matches])
+    return [{**m, "email": emails.get(m["user_id"])} for m in matches]
+
+
+# ==========================================
+# 1:N Identity Search (Admin Only)
+# ==========================================
+@router.post("/identity-search")
+async def identity_search(
+    file: UploadFile = File(...),
+    top_k: int = 5,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    contents = await file.read()
+
+    try:
+        embedding = await ai_client.generate_embedding(contents)
+    except ai_client.AIServiceError:
+        raise HTTPException(400, "Face detection failed")
+
+    if not embedding:
+        raise HTTPException(400, "No face detected")
+
+    await db.run_sync(identity_index.ensure_loaded)
+    matches = identity_index.search(embedding, top_k=top_k)
+
+    return {"matches": await db.run_sync(with_emails, matches)}
 
 # =====================
 # Admin Questions
@@ -176,4 +530,21 @@ def add_question(
     db.commit()
     db.refresh(new_question)
 
-    return {"message": "Question added"}
\ No newline at end of file
+    question_cache.invalidate(exam_id)
+
+    return {"message": "Question added"}
+
+
+@router.post("/exams/{exam_id}/regrade")
+def regrade(
+    exam_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    regraded, skipped = regrade_exam(db, exam_id)
+
+    # Skipped: submitted before answers were stored, so their score stands
+    return {"exam_id": exam_id, "sessions_regraded": regraded, "sessions_skipped": skipped}
@@ -1,22 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 import models
 import schemas
 from auth import get_current_user
 from datetime import datetime
+from question_cache import cached_response, question_cache
+from grading import answer_keys, parse_submission
+from session_state import session_state, session_states
+from live_events import event_bus
 
 router = APIRouter(prefix="/exams", tags=["Exams"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/", response_model=schemas.ExamOut)
 def create_exam(
     exam: schemas.ExamCreate,
@@ -52,22 +50,16 @@ def list_exams(
 @router.get("/{exam_id}/questions")
 def get_questions(
     exam_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    bank = question_cache.get(db, exam_id)
 
-    exam = db.query(models.Exam).filter(
-        models.Exam.id == exam_id
-    ).first()
-
-    questions = db.query(models.Question).filter(
-        models.Question.exam_id == exam_id
-    ).all()
+    if bank is None:
+        raise HTTPException(404, "Exam not found")
 
-    return {
-        "duration": exam.duration_minutes,
-        "questions": questions
-    }
+    return cached_response(bank.exam, bank.exam_etag, if_none_match)
 
 
 # Submit answers
@@ -86,23 +78,41 @@ def submit_exam(
     if not session:
         raise HTTPException(404, "Session not found")
 
-    questions = db.query(models.Question).filter(
-        models.Question.exam_id == session.exam_id
-    ).all()
+    key = answer_keys.get(db, session.exam_id)
 
-    score = 0
-    total = len(questions)
+    question_ids, selected = parse_submission(answers)
+    in_exam, correct = key.match(question_ids, selected)
 
-    for q in questions:
-        if str(q.id) in answers:
-            if answers[str(q.id)] == q.correct_option:
-                score += 1
+    score = int(correct.sum())
+    total = len(key)
+
+    # Resubmitting replaces the stored answers rather than adding to them
+    db.query(models.Answer).filter(
+        models.Answer.session_id == session_id
+    ).delete(synchronize_session=False)
+
+    rows = [
+        {"session_id": session_id, "question_id": qid, "selected_option": option}
+        for qid, option, keep in zip(question_ids, selected, in_exam) if keep
+    ]
+    if rows:
+        db.execute(insert(models.Answer), rows)
 
     session.status = "completed"
     session.score = score
     session.total_questions = total
     session.submitted_at = datetime.utcnow()
+    state = session_state(session)
 
     db.commit()
 
+    session_states.put_session_state(session_id, state)
+
+    event_bus.publish("session_completed", state["exam_id"], {
+        "session_id": session_id,
+        "exam_id": state["exam_id"],
+        "score": score,
+        "total_questions": total
+    })
+
     return {"message": "Submission successful"}
\ No newline at end of file
@@ -1,21 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import bindparam, case, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy.exc import IntegrityError
+from database import get_db, get_async_db
 import models
+import schemas
+from embedding_store import embedding_store
+from question_cache import cached_response, question_cache
+from session_state import session_state, session_states
+from live_events import event_bus
 from auth import get_current_user
 from datetime import datetime
+from typing import Optional
 from fastapi import Query 
+import os
 
 
 router = APIRouter(prefix="/sessions", tags=["Sessions"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Similarity a live face needs to the enrolled one during the exam
+REVERIFY_THRESHOLD = float(os.getenv("REVERIFY_THRESHOLD", "0.6"))
 
 
 # =====================================================
@@ -30,17 +35,10 @@ def start_exam(
     if current_user["role"] != "candidate":
         raise HTTPException(status_code=403, detail="Only candidates can start exams")
 
-    user = db.query(models.User).filter(
-        models.User.email == current_user["email"]
-    ).first()
+    user_id = current_user["id"]
 
     # Check latest verification
-    verification = db.query(models.IdentityVerificationLog).filter(
-        models.IdentityVerificationLog.user_id == user.id,
-        models.IdentityVerificationLog.exam_id == exam_id
-    ).order_by(models.IdentityVerificationLog.timestamp.desc()).first()
-
-    if not verification or verification.success is not True:
+    if not session_states.load_verified(db, user_id, exam_id):
         raise HTTPException(
             status_code=403,
             detail="Face verification required before starting exam"
@@ -48,7 +46,7 @@ def start_exam(
 
     # Create session
     new_session = models.ExamSession(
-        user_id=user.id,
+        user_id=user_id,
         exam_id=exam_id,
         status="active"
     )
@@ -57,6 +55,15 @@ def start_exam(
     db.commit()
     db.refresh(new_session)
 
+    session_states.put_session(new_session)
+
+    event_bus.publish("session_started", exam_id, {
+        "session_id": new_session.id,
+        "user_id": user_id,
+        "exam_id": exam_id,
+        "started_at": new_session.started_at
+    })
+
     return {
         "session_id": new_session.id,
         "status": "exam started"
@@ -79,12 +86,85 @@ def terminate_exam(
 
     session.status = "terminated"
     session.ended_at = datetime.utcnow()
+    state = session_state(session)
 
     db.commit()
 
+    session_states.put_session_state(session_id, state)
+
+    event_bus.publish("session_terminated", state["exam_id"], {
+        "session_id": session_id,
+        "exam_id": state["exam_id"],
+        "reason": "manual",
+        "warnings": state["warnings"]
+    })
+
     return {"message": "Exam terminated"}
 
 
+def apply_violation_rules(session, severity):
+    # Warning logic
+    if severity in ["LOW", "MEDIUM"]:
+        session.warning_count += 1
+
+    # Termination logic
+    if severity == "HIGH" or session.warning_count >= 3:
+        session.status = "terminated"
+        session.ended_at = datetime.utcnow()
+
+
+def violation_rules_update(severity):
+    # apply_violation_rules as UPDATE ... SET values, evaluated by the database
+    warnings = models.ExamSession.warning_count
+    if severity in ["LOW", "MEDIUM"]:
+        warnings = warnings + 1
+
+    if severity == "HIGH":
+        return {
+            models.ExamSession.warning_count: warnings,
+            models.ExamSession.status: "terminated",
+            models.ExamSession.ended_at: datetime.utcnow()
+        }
+
+    terminate = warnings >= 3
+    return {
+        models.ExamSession.warning_count: warnings,
+        models.ExamSession.status: case((terminate, "terminated"), else_=models.ExamSession.status),
+        models.ExamSession.ended_at: case((terminate, datetime.utcnow()), else_=models.ExamSession.ended_at)
+    }
+
+
+def violation_event(violation):
+    # Read after flush and before commit, while the row's attributes are loaded
+    return {
+        "violation_id": violation.id,
+        "session_id": violation.session_id,
+        "type": violation.type,
+        "severity": violation.severity,
+        "confidence": violation.confidence,
+        "evidence_url": violation.evidence_url,
+        "timestamp": violation.timestamp,
+        "ended_at": violation.ended_at
+    }
+
+
+def publish_violation(event, exam_id, warnings, status, reason):
+    event_bus.publish("violation", exam_id, {
+        **event,
+        "exam_id": exam_id,
+        "warnings": warnings,
+        "status": status
+    })
+
+    if reason:
+        event_bus.publish("session_terminated", exam_id, {
+            "session_id": event["session_id"],
+            "exam_id": exam_id,
+            "reason": reason,
+            "warnings": warnings
+        })
+
+
 # =====================================================
 # REPORT VIOLATION (WITH HARD STOP)
 # =====================================================
@@ -95,22 +175,59 @@ def report_violation(
     severity: str = Query(...),
     confidence: float = Query(...),
     evidence_url: str = Query(None),
+    detected_at: datetime = Query(None),
+    idempotency_key: str = Query(None),
     db: Session = Depends(get_db)
 ):
-    session = db.query(models.ExamSession).filter(
-        models.ExamSession.id == session_id
-    ).first()
+    state = session_states.load_session(db, session_id)
 
-    if not session:
+    if not state:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # HARD STOP — if already terminated, do nothing
-    if session.status == "terminated":
+    if state["status"] == "terminated":
         return {
-            "warnings": session.warning_count,
+            "warnings": state["warnings"],
             "status": "terminated"
         }
 
+    # Retried delivery of a violation we already stored — report state only
+    if idempotency_key and db.query(models.Violation.id).filter(
+        models.Violation.idempotency_key == idempotency_key
+    ).first():
+        return {
+            "warnings": state["warnings"],
+            "status": state["status"],
+            "reason": None
+        }
+
+    # Apply the warning rules in the UPDATE itself, so concurrent reports
+    # cannot lose a warning and no session read is needed
+    row = db.execute(
+        update(models.ExamSession)
+        .where(
+            models.ExamSession.id == session_id,
+            models.ExamSession.status != "terminated"
+        )
+        .values(violation_rules_update(severity))
+        .returning(
+            models.ExamSession.user_id,
+            models.ExamSession.exam_id,
+            models.ExamSession.status,
+            models.ExamSession.warning_count
+        )
+    ).first()
+
+    if row is None:
+        # Terminated by a concurrent report since the state was cached
+        db.rollback()
+        session = db.get(models.ExamSession, session_id)
+        state = session_states.put_session(session)
+        return {
+            "warnings": state["warnings"],
+            "status": state["status"]
+        }
+
     # Save violation
     violation = models.Violation(
         session_id=session_id,
@@ -118,64 +235,226 @@ def report_violation(
         severity=severity,
         confidence=confidence,   
         evidence_url=evidence_url,
-        timestamp=datetime.utcnow()
+        timestamp=detected_at or datetime.utcnow(),
+        idempotency_key=idempotency_key
     )
 
     db.add(violation)
 
-    # Warning logic
-    if severity in ["LOW", "MEDIUM"]:
-        session.warning_count += 1
+    try:
+        db.flush()
+        event = violation_event(violation)
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry stored the same idempotency key first
+        db.rollback()
+        state = session_states.load_session(db, session_id)
+        return {
+            "warnings": state["warnings"],
+            "status": state["status"],
+            "reason": None
+        }
 
-    termination_reason = None
-    # Termination logic
-    if severity == "HIGH" or session.warning_count >= 3:
-        session.status = "terminated"
-        session.ended_at = datetime.utcnow()
-        termination_reason = violation_type
+    state = session_states.put_session_state(session_id, {
+        "user_id": row.user_id,
+        "exam_id": row.exam_id,
+        "status": row.status,
+        "warnings": row.warning_count
+    })
 
-    db.commit()
-    db.refresh(session)
+    reason = violation_type if state["status"] == "terminated" else None
+    publish_violation(event, row.exam_id, state["warnings"], state["status"], reason)
 
     return {
-        "warnings": session.warning_count,
-        "status": session.status,
-        "reason": violation_type if session.status == "terminated" else None
+        "warnings": state["warnings"],
+        "status": state["status"],
+        "reason": reason
+    }
+
+# =====================================================
+# REPORT VIOLATIONS IN BULK (ONE TRANSACTION)
+# =====================================================
+@router.post("/violations/bulk")
+def report_violations_bulk(
+    batch: schemas.ViolationBatch,
+    db: Session = Depends(get_db)
+):
+    session_ids = {v.session_id for v in batch.violations}
+
+    # One query for every affected session, locked until we commit. Locks
+    # are taken in id order so concurrent batches can't deadlock each other.
+    sessions = {
+        s.id: s for s in db.query(models.ExamSession).filter(
+            models.ExamSession.id.in_(session_ids)
+        ).order_by(models.ExamSession.id).with_for_update().all()
     }
 
+    keys = [v.idempotency_key for v in batch.violations if v.idempotency_key]
+    seen_keys = set()
+    if keys:
+        seen_keys = {
+            key for (key,) in db.query(models.Violation.idempotency_key).filter(
+                models.Violation.idempotency_key.in_(keys)
+            )
+        }
+
+    new_violations = []
+    pending_by_key = {}
+    episode_ends = {}
+    updates = []
+    session_reasons = {}
+    results = []
+
+    # Applied in the order sent, so warning counts match one-by-one reporting
+    for v in batch.violations:
+        session = sessions.get(v.session_id)
+
+        if not session:
+            results.append({
+                "session_id": v.session_id,
+                "idempotency_key": v.idempotency_key,
+                "error": "Session not found"
+            })
+            continue
+
+        duplicate = v.idempotency_key is not None and v.idempotency_key in seen_keys
+
+        # A re-sent violation carrying ended_at closes that episode
+        if duplicate and v.ended_at is not None:
+            if v.idempotency_key in pending_by_key:
+                pending_by_key[v.idempotency_key].ended_at = v.ended_at
+            else:
+                episode_ends[v.idempotency_key] = v.ended_at
+
+        # HARD STOP — terminated sessions and retried violations change nothing
+        if not duplicate and session.status != "terminated":
+            if v.idempotency_key:
+                seen_keys.add(v.idempotency_key)
+
+            violation = models.Violation(
+                session_id=session.id,
+                type=v.violation_type,
+                severity=v.severity,
+                confidence=v.confidence,
+                evidence_url=v.evidence_url,
+                timestamp=v.detected_at or datetime.utcnow(),
+                ended_at=v.ended_at,
+                idempotency_key=v.idempotency_key
+            )
+            new_violations.append(violation)
+            if v.idempotency_key:
+                pending_by_key[v.idempotency_key] = violation
+
+            apply_violation_rules(session, v.severity)
+
+            if session.status == "terminated":
+                session_reasons[session.id] = v.violation_type
+
+            updates.append((
+                violation, session.exam_id, session.warning_count, session.status,
+                session_reasons.get(session.id) if session.status == "terminated" else None
+            ))
+
+        results.append({
+            "session_id": session.id,
+            "idempotency_key": v.idempotency_key,
+            "warnings": session.warning_count,
+            "status": session.status,
+            "reason": session_reasons.get(session.id) if session.status == "terminated" else None
+        })
+
+    db.add_all(new_violations)
+
+    if episode_ends:
+        violations = models.Violation.__table__
+        db.execute(
+            update(violations)
+            .where(violations.c.idempotency_key == bindparam("key"))
+            .values(ended_at=bindparam("ended")),
+            [{"key": key, "ended": ended} for key, ended in episode_ends.items()]
+        )
+
+    states = {session_id: session_state(session) for session_id, session in sessions.items()}
+
+    try:
+        db.flush()
+        events = [(violation_event(violation), *rest) for violation, *rest in updates]
+        db.commit()
+    except IntegrityError:
+        # A concurrent batch stored one of these keys first; the sender retries
+        db.rollback()
+        raise HTTPException(status_code=503, detail="Conflicting concurrent delivery, retry")
+
+    for session_id, state in states.items():
+        session_states.put_session_state(session_id, state)
+
+    for event in events:
+        publish_violation(*event)
+
+    return {
+        "stored": len(new_violations),
+        "results": results
+    }
+
+
+# =====================================================
+# IN-EXAM RE-VERIFICATION (AI SERVICE)
+# =====================================================
+@router.post("/{session_id}/reverify")
+def reverify_session_face(
+    session_id: int,
+    payload: schemas.LiveEmbedding,
+    db: Session = Depends(get_db)
+):
+    # Compared here so enrolled templates never leave the backend, and the
+    # caller only learns match or no match: a raw score would let anyone
+    # probe a candidate's template with embeddings of their choosing
+    state = session_states.load_session(db, session_id)
+
+    if state is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if len(payload.embedding) != embedding_store.dim:
+        raise HTTPException(status_code=422, detail="Invalid embedding size")
+
+    user_id = state["user_id"]
+
+    if embedding_store.get(user_id) is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user and user.face_enrolled:
+            embedding_store.load(user)
+
+    similarity = embedding_store.similarity(user_id, payload.embedding)
+
+    if similarity is None:
+        raise HTTPException(status_code=404, detail="No enrolled face found")
+
+    return {"match": similarity >= REVERIFY_THRESHOLD}
+
+
 @router.get("/validate/{session_id}")
-def validate_session(
+async def validate_session(
     session_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if current_user["role"] != "candidate":
         raise HTTPException(status_code=403, detail="Candidate access only")
 
-    user = db.query(models.User).filter(
-        models.User.email == current_user["email"]
-    ).first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user_id = current_user["id"]
 
-    session = db.query(models.ExamSession).filter(
-        models.ExamSession.id == session_id,
-        models.ExamSession.user_id == user.id
-    ).first()
+    # Answered from the session-state cache; the database only on a miss
+    state = await session_states.load_session_async(db, session_id)
 
-    if not session:
+    if not state or state["user_id"] != user_id:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    if session.status != "active":
+    if state["status"] != "active":
         raise HTTPException(status_code=403, detail="Session not active")
 
-    verification = db.query(models.IdentityVerificationLog).filter(
-        models.IdentityVerificationLog.user_id == user.id,
-        models.IdentityVerificationLog.exam_id == session.exam_id
-    ).order_by(models.IdentityVerificationLog.timestamp.desc()).first()
+    verified = await session_states.load_verified_async(db, user_id, state["exam_id"])
 
-    if not verification or verification.success is not True:
+    if not verified:
         raise HTTPException(status_code=403, detail="Face verification not completed")
 
     return {"valid": True}
@@ -183,11 +462,13 @@ def validate_session(
 @router.get("/questions/{exam_id}")
 def get_questions(
     exam_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    questions = db.query(models.Question).filter(
-        models.Question.exam_id == exam_id
-    ).all()
+    bank = question_cache.get(db, exam_id)
+
+    if bank is None:
+        return []
 
-    return questions 
+    return cached_response(bank.questions, bank.questions_etag, if_none_match) 
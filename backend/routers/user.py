@@ -1,33 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 import models
 import schemas
 import auth
 from auth import get_current_user
 from fastapi.security import OAuth2PasswordRequestForm
-import numpy as np
-import json
-import requests
+import ai_client
+from embedding_store import embedding_store, normalize
+from identity_index import identity_index, IDENTITY_MATCH_THRESHOLD
+from session_state import session_states
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/me")
 def get_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
 @router.post("/register")
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    hashed = auth.hash_password(user.password)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    hashed = await auth.hash_password_async(user.password)
     new_user = models.User(
         name=user.name,
         email=user.email,
@@ -35,29 +30,29 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return {"message": "User created successfully"}
 
 
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_user = db.query(models.User).filter(
-        models.User.email == form_data.username
-    ).first()
+    db_user = (await db.execute(
+        select(models.User).where(models.User.email == form_data.username)
+    )).scalar_one_or_none()
 
     if not db_user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    if not auth.verify_password(form_data.password, db_user.password):
+    if not await auth.verify_password_async(form_data.password, db_user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     token = auth.create_access_token({
         "sub": db_user.email,
+        "uid": db_user.id,
         "role": db_user.role
     })
 
@@ -69,51 +64,61 @@ async def verify_face(
     exam_id: int,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if current_user["role"] != "candidate":
         raise HTTPException(status_code=403, detail="Only candidates allowed")
 
-    user = db.query(models.User).filter(
-        models.User.email == current_user["email"]
-    ).first()
+    user_id = current_user["id"]
+
+    # Enrolled embeddings are cached, so the User row is only read on a miss
+    stored_embedding = embedding_store.get(user_id)
+    if stored_embedding is None:
+        user = await db.get(models.User, user_id)
+        if user is not None and user.face_enrolled:
+            stored_embedding = embedding_store.load(user)
 
-    if not user.face_enrolled or not user.face_embedding:
+    if stored_embedding is None:
         raise HTTPException(status_code=400, detail="No enrolled face found")
 
     contents = await file.read()
 
-    response = requests.post(
-        "http://ai-service:8001/generate-embedding",
-        files={"file": ("image.jpg", contents, "image/jpeg")}
-    )
-
-    if response.status_code != 200:
+    try:
+        live_embedding = await ai_client.generate_embedding(contents)
+    except ai_client.AIServiceError:
         raise HTTPException(status_code=500, detail="AI service error")
 
-    live_embedding = response.json().get("embedding")
-
     if not live_embedding:
         raise HTTPException(status_code=400, detail="No face detected")
 
-    stored_embedding = np.array(json.loads(user.face_embedding))
-    live_embedding = np.array(live_embedding)
+    # Both vectors are unit length, so the dot product is the cosine similarity
+    similarity = float(stored_embedding @ normalize(live_embedding))
 
-    similarity = np.dot(stored_embedding, live_embedding) / (
-        np.linalg.norm(stored_embedding) * np.linalg.norm(live_embedding)
-    )
+    success = similarity >= IDENTITY_MATCH_THRESHOLD
 
-    success = similarity >= 0.6
+    # On a mismatch, check whether the face belongs to another enrolled candidate
+    impersonated = None
+    if not success:
+        await db.run_sync(identity_index.ensure_loaded)
+        matches = identity_index.search(live_embedding, top_k=1, exclude_user_id=user_id)
+        if matches:
+            impersonated = matches[0]["user_id"]
 
     log = models.IdentityVerificationLog(
-        user_id=user.id,
+        user_id=user_id,
         exam_id=exam_id,
         similarity_score=float(similarity),
-        success=success
+        success=success,
+        matched_user_id=impersonated
     )
 
     db.add(log)
-    db.commit()
+    await db.commit()
+
+    await session_states.set_verified_async(user_id, exam_id, success)
+
+    if impersonated is not None:
+        raise HTTPException(status_code=403, detail="Face matches a different enrolled candidate")
 
     if not success:
         raise HTTPException(status_code=403, detail="Face verification failed")
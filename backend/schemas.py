@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
 
 class UserCreate(BaseModel):
     name: str
@@ -36,4 +38,23 @@ class QuestionCreate(BaseModel):
     option_b: str
     option_c: str
     option_d: str
-    correct_option: str
\ No newline at end of file
+    correct_option: str
+
+
+class ViolationReport(BaseModel):
+    session_id: int
+    violation_type: str
+    severity: str
+    confidence: float
+    evidence_url: Optional[str] = None
+    detected_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    idempotency_key: Optional[str] = None
+
+
+class ViolationBatch(BaseModel):
+    violations: list[ViolationReport]
+
+
+class LiveEmbedding(BaseModel):
+    embedding: list[float]
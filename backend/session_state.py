@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from starlette.concurrency import run_in_threadpool
+
+import models
+
+SESSION_STATE_CACHE_SIZE = int(os.getenv("SESSION_STATE_CACHE_SIZE", "100000"))
+SESSION_STATE_TTL_SECONDS = int(os.getenv("SESSION_STATE_TTL_SECONDS", "86400"))
+
+# With Redis, other workers may have changed a session: local copies are
+# trusted for this long before being re-read from Redis
+SESSION_STATE_LOCAL_TTL_SECONDS = float(os.getenv("SESSION_STATE_LOCAL_TTL_SECONDS", "2"))
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Only ever moves forward: active -> terminated/completed, warnings only grow.
+# Writes that would move a cached session backwards (a slower writer
+# finishing late) are ignored, in Redis and locally.
+SET_IF_NEWER = """
+local function rank(state)
+    if state.status == 'active' then return 0 end
+    return 1
+end
+local current = redis.call('GET', KEYS[1])
+if current then
+    local old = cjson.decode(current)
+    local new = cjson.decode(ARGV[1])
+    if rank(old) > rank(new) or (rank(old) == rank(new) and old.warnings > new.warnings) then
+        return current
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return ARGV[1]
+"""
+
+
+def _rank(state):
+    return (0 if state["status"] == "active" else 1, state["warnings"])
+
+
+def session_state(session):
+    return {
+        "user_id": session.user_id,
+        "exam_id": session.exam_id,
+        "status": session.status,
+        "warnings": session.warning_count or 0
+    }
+
+
+class SessionStateCache:
+    """
+    Write-through cache of exam-session state (owner, status, warning count)
+    and of each candidate's face-verification result per exam, so
+    validate_session and violation checks are answered from memory.
+
+    Every path that changes a session writes its committed state here;
+    misses fall back to Redis (if configured) and then the database.
+
+    The Redis client is synchronous: async handlers use the *_async methods,
+    which run Redis calls in the threadpool instead of on the event loop.
+    """
+
+    def __init__(self, redis_url=None, local_ttl_seconds=2.0, ttl_seconds=86400, max_entries=100000):
+        self.local_ttl_seconds = local_ttl_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url else None
+        self._set_if_newer = self.redis.register_script(SET_IF_NEWER) if self.redis else None
+
+        self.db_loads = 0
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- tiers ------------------------------------------------------
+
+    def _get_local(self, key, now):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None, False
+
+            value, stored_at = entry
+            self._local.move_to_end(key)
+            fresh = self.redis is None or now - stored_at < self.local_ttl_seconds
+            return value, fresh
+
+    def _set_local(self, key, value, now, monotonic=False):
+        with self._lock:
+            entry = self._local.get(key)
+            if monotonic and entry is not None and _rank(entry[0]) > _rank(value):
+                value = entry[0]
+
+            self._local[key] = (value, now)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+            return value
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        value, fresh = self._get_local(key, now)
+
+        if fresh or self.redis is None:
+            return value
+
+        try:
+            stored = self.redis.get(key)
+        except redis.RedisError:
+            # Redis unreachable: a stale local copy beats a database read
+            return value
+
+        if stored is None:
+            return None
+
+        value = json.loads(stored)
+        self._set_local(key, value, now)
+        return value
+
+    def _store(self, key, value, monotonic=False):
+        if self.redis is not None:
+            try:
+                if monotonic:
+                    value = json.loads(self._set_if_newer(keys=[key], args=[json.dumps(value), self.ttl_seconds]))
+                else:
+                    self.redis.set(key, json.dumps(value), ex=self.ttl_seconds)
+            except redis.RedisError:
+                pass
+
+        # The value actually kept, which for a stale monotonic write is the newer one
+        return self._set_local(key, value, time.monotonic(), monotonic=monotonic)
+
+    # ---- sessions ---------------------------------------------------
+
+    def cached_session(self, session_id):
+        # Memory only: None means "unknown here", not "no such session"
+        value, fresh = self._get_local(f"session:{session_id}", time.monotonic())
+        return value if fresh else None
+
+    def fetch_session(self, session_id):
+        # Memory, then Redis; may block on Redis
+        return self._lookup(f"session:{session_id}")
+
+    def load_session(self, db, session_id):
+        # Memory, then Redis, then the database
+        state = self.fetch_session(session_id)
+        if state is not None:
+            return state
+
+        state = self._session_from_db(db, session_id)
+        if state is None:
+            return None
+        return self.put_session_state(session_id, state)
+
+    async def load_session_async(self, db, session_id):
+        # load_session for async handlers; db is an AsyncSession
+        state = self.cached_session(session_id)
+        if state is None:
+            state = await self._offload(self.fetch_session, session_id)
+        if state is not None:
+            return state
+
+        state = await db.run_sync(self._session_from_db, session_id)
+        if state is None:
+            return None
+        return await self._offload(self.put_session_state, session_id, state)
+
+    def _session_from_db(self, db, session_id):
+        self.db_loads += 1
+        session = db.get(models.ExamSession, session_id)
+        return session_state(session) if session is not None else None
+
+    def put_session(self, session):
+        return self.put_session_state(session.id, session_state(session))
+
+    def put_session_state(self, session_id, state):
+        return self._store(f"session:{session_id}", state, monotonic=True)
+
+    # ---- face verification ------------------------------------------
+
+    def cached_verified(self, user_id, exam_id):
+        value, fresh = self._get_local(f"verified:{user_id}:{exam_id}", time.monotonic())
+        return value if fresh else None
+
+    def fetch_verified(self, user_id, exam_id):
+        return self._lookup(f"verified:{user_id}:{exam_id}")
+
+    def load_verified(self, db, user_id, exam_id):
+        # Whether the latest face verification for (user, exam) succeeded
+        verified = self.fetch_verified(user_id, exam_id)
+        if verified is not None:
+            return verified
+
+        return self.set_verified(user_id, exam_id, self._verified_from_db(db, user_id, exam_id))
+
+    async def load_verified_async(self, db, user_id, exam_id):
+        verified = self.cached_verified(user_id, exam_id)
+        if verified is None:
+            verified = await self._offload(self.fetch_verified, user_id, exam_id)
+        if verified is not None:
+            return verified
+
+        verified = await db.run_sync(self._verified_from_db, user_id, exam_id)
+        return await self.set_verified_async(user_id, exam_id, verified)
+
+    def _verified_from_db(self, db, user_id, exam_id):
+        self.db_loads += 1
+        log = db.query(models.IdentityVerificationLog.success).filter(
+            models.IdentityVerificationLog.user_id == user_id,
+            models.IdentityVerificationLog.exam_id == exam_id
+        ).order_by(models.IdentityVerificationLog.timestamp.desc()).first()
+
+        return bool(log and log.success is True)
+
+    def set_verified(self, user_id, exam_id, verified):
+        return self._store(f"verified:{user_id}:{exam_id}", verified)
+
+    async def set_verified_async(self, user_id, exam_id, verified):
+        return await self._offload(self.set_verified, user_id, exam_id, verified)
+
+    async def _offload(self, fn, *args):
+        # Without Redis everything is in memory and safe to run on the loop
+        if self.redis is None:
+            return fn(*args)
+        return await run_in_threadpool(fn, *args)
+
+    def stats(self):
+        return {
+            "entries": len(self._local),
+            "db_loads": self.db_loads,
+            "redis": self.redis is not None
+        }
+
+
+session_states = SessionStateCache(
+    redis_url=REDIS_URL,
+    local_ttl_seconds=SESSION_STATE_LOCAL_TTL_SECONDS,
+    ttl_seconds=SESSION_STATE_TTL_SECONDS,
+    max_entries=SESSION_STATE_CACHE_SIZE
+)
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import models
+from grading import AnswerKey, parse_submission, regrade_exam
+from question_cache import question_cache
+
+
+def make_key():
+    # Out of id order on purpose: AnswerKey sorts them
+    return AnswerKey([30, 10, 20], ["C", "A", "B"])
+
+
+def score(key, answers):
+    question_ids, selected = parse_submission(answers)
+    return int(key.match(question_ids, selected)[1].sum())
+
+
+def test_scores_correct_answers():
+    key = make_key()
+
+    assert len(key) == 3
+    assert score(key, {"10": "A", "20": "B", "30": "C"}) == 3
+    assert score(key, {"10": "A", "20": "C", "30": "D"}) == 1
+    assert score(key, {}) == 0
+
+
+def test_match_flags_questions_outside_the_exam():
+    in_exam, correct = make_key().match([10, 11, 99, 5], ["A", "A", "A", "A"])
+
+    assert in_exam.tolist() == [True, False, False, False]
+    assert correct.tolist() == [True, False, False, False]
+
+
+def test_non_canonical_keys_do_not_answer_twice():
+    key = make_key()
+
+    assert parse_submission({"10": "A", "010": "A", "0010": "A"}) == ([10], ["A"])
+    assert score(key, {"10": "A", "010": "A", "0010": "A"}) == 1
+
+
+def test_ignores_keys_and_values_that_are_not_answers():
+    answers = {"²": "A", "١٠": "A", "-10": "A", "": "A", "x": "A", "20": ["B"], "30": "C"}
+
+    assert parse_submission(answers) == ([30], ["C"])
+    assert score(make_key(), answers) == 1
+
+
+def test_empty_key_matches_nothing():
+    in_exam, correct = AnswerKey([], []).match([1, 2], ["A", "B"])
+
+    assert not in_exam.any()
+    assert not correct.any()
+
+
+def make_exam(db, correct_options):
+    exam = models.Exam(title="Regrade", duration_minutes=30)
+    db.add(exam)
+    db.flush()
+
+    questions = [models.Question(exam_id=exam.id, correct_option=o) for o in correct_options]
+    db.add_all(questions)
+
+    def submitted(score, answers):
+        session = models.ExamSession(
+            exam_id=exam.id, status="completed", score=score,
+            total_questions=len(correct_options), submitted_at=datetime.utcnow()
+        )
+        db.add(session)
+        db.flush()
+        db.add_all([
+            models.Answer(session_id=session.id, question_id=questions[i].id, selected_option=o)
+            for i, o in answers.items()
+        ])
+        return session
+
+    # The ids are new to this database, but not to the process-wide cache
+    question_cache.invalidate(exam.id)
+    return exam, submitted
+
+
+def test_regrade_rescores_sessions_with_stored_answers(db):
+    exam, submitted = make_exam(db, ["A", "B", "C"])
+    session = submitted(0, {0: "A", 1: "B", 2: "D"})
+    db.commit()
+
+    assert regrade_exam(db, exam.id) == (1, 0)
+    assert db.get(models.ExamSession, session.id).score == 2
+
+
+def test_regrade_leaves_sessions_without_answers_alone(db):
+    exam, submitted = make_exam(db, ["A", "B"])
+    # Submitted before answers were stored: its score can't be recomputed
+    legacy = submitted(2, {})
+    current = submitted(0, {0: "A"})
+    db.commit()
+
+    assert regrade_exam(db, exam.id) == (1, 1)
+
+    db.expire_all()
+    assert db.get(models.ExamSession, legacy.id).score == 2
+    assert db.get(models.ExamSession, legacy.id).total_questions == 2
+    assert db.get(models.ExamSession, current.id).score == 1
+
+
+def test_regrade_with_no_stored_answers_changes_nothing(db):
+    exam, submitted = make_exam(db, ["A"])
+    legacy = submitted(1, {})
+    db.commit()
+
+    assert regrade_exam(db, exam.id) == (0, 1)
+    assert db.get(models.ExamSession, legacy.id).score == 1
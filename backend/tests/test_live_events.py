@@ -0,0 +1,130 @@
+import asyncio
+
+from live_events import EventBus
+from routers import admin as admin_router
+
+ADMIN = {"id": 1, "email": "admin@test", "role": "admin"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def publish(bus, count, exam_id=1):
+    for i in range(count):
+        bus.publish("violation", exam_id, {"n": i})
+
+
+def test_resume_returns_only_missed_events():
+    bus = EventBus(buffer_size=10)
+    publish(bus, 5)
+    last_seen = f"{bus.epoch}-3"
+
+    async def scenario():
+        subscription, backlog, complete = bus.subscribe(last_seen)
+        bus.unsubscribe(subscription)
+        return backlog, complete
+
+    backlog, complete = run(scenario())
+
+    assert complete
+    assert [event.seq for event in backlog] == [4, 5]
+
+
+def test_new_subscriber_gets_no_backlog():
+    bus = EventBus(buffer_size=10)
+    publish(bus, 3)
+
+    async def scenario():
+        subscription, backlog, complete = bus.subscribe(None)
+        bus.unsubscribe(subscription)
+        return backlog, complete
+
+    assert run(scenario()) == ([], True)
+
+
+def test_gap_past_the_buffer_needs_a_resync():
+    bus = EventBus(buffer_size=3)
+    publish(bus, 10)
+
+    async def scenario():
+        subscription, backlog, complete = bus.subscribe(f"{bus.epoch}-2")
+        bus.unsubscribe(subscription)
+        return backlog, complete
+
+    backlog, complete = run(scenario())
+
+    assert not complete
+    # Whatever is still buffered is sent after the resync
+    assert [event.seq for event in backlog] == [8, 9, 10]
+
+
+def test_id_from_before_a_restart_needs_a_resync():
+    bus = EventBus(buffer_size=10)
+    publish(bus, 2)
+
+    async def scenario():
+        subscription, backlog, complete = bus.subscribe("0000dead-1")
+        bus.unsubscribe(subscription)
+        return complete
+
+    assert not run(scenario())
+
+
+def test_published_events_reach_subscribers():
+    bus = EventBus(buffer_size=10)
+
+    async def scenario():
+        subscription, _, _ = bus.subscribe(None)
+        publish(bus, 2)
+        events = [await asyncio.wait_for(subscription.queue.get(), 1) for _ in range(2)]
+        bus.unsubscribe(subscription)
+        return events
+
+    events = run(scenario())
+
+    assert [event.data for event in events] == ['{"n": 0}', '{"n": 1}']
+    assert events[0].format().startswith(f"id: {bus.epoch}-1\nevent: violation\n")
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def stream_chunks(monkeypatch, bus, last_event_id, count):
+    monkeypatch.setattr(admin_router, "event_bus", bus)
+
+    async def scenario():
+        response = await admin_router.live_events(
+            ConnectedRequest(), exam_id=None, last_event_id=last_event_id, current_user=ADMIN
+        )
+        body = response.body_iterator
+        chunks = [await body.__anext__() for _ in range(count)]
+        await body.aclose()
+        return chunks
+
+    return run(scenario())
+
+
+def test_stream_sends_resync_before_buffered_events_on_a_gap(monkeypatch):
+    bus = EventBus(buffer_size=2)
+    publish(bus, 5)
+
+    chunks = stream_chunks(monkeypatch, bus, f"{bus.epoch}-1", 4)
+
+    assert chunks[0].startswith("retry:")
+    assert chunks[1] == "event: resync\ndata: {}\n\n"
+    assert chunks[2].startswith(f"id: {bus.epoch}-4\n")
+    assert chunks[3].startswith(f"id: {bus.epoch}-5\n")
+    assert bus.stats()["subscribers"] == 0
+
+
+def test_stream_resumes_without_resync(monkeypatch):
+    bus = EventBus(buffer_size=10)
+    publish(bus, 3)
+
+    chunks = stream_chunks(monkeypatch, bus, f"{bus.epoch}-2", 2)
+
+    assert chunks[0].startswith("retry:")
+    assert chunks[1].startswith(f"id: {bus.epoch}-3\n")
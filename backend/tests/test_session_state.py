@@ -0,0 +1,84 @@
+import pytest
+
+import models
+import session_state
+from session_state import SessionStateCache
+
+
+def state(status="active", warnings=0):
+    return {"user_id": 1, "exam_id": 1, "status": status, "warnings": warnings}
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    # Caches built after this share one fake Redis, like workers behind one server
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        session_state.redis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+
+def test_local_writes_never_move_a_session_backwards():
+    cache = SessionStateCache()
+
+    cache.put_session_state(1, state(warnings=2))
+    assert cache.put_session_state(1, state(warnings=1)) == state(warnings=2)
+
+    cache.put_session_state(1, state("terminated", 2))
+    assert cache.put_session_state(1, state(warnings=2))["status"] == "terminated"
+    assert cache.cached_session(1) == state("terminated", 2)
+
+
+def test_local_writes_move_forward():
+    cache = SessionStateCache()
+
+    cache.put_session_state(1, state(warnings=1))
+    assert cache.put_session_state(1, state(warnings=2)) == state(warnings=2)
+    assert cache.put_session_state(1, state("completed", 2)) == state("completed", 2)
+
+
+def test_redis_rejects_a_stale_downgrade_from_another_worker(shared_redis):
+    fast = SessionStateCache(redis_url="redis://test")
+    slow = SessionStateCache(redis_url="redis://test")
+
+    fast.put_session_state(1, state("terminated", 3))
+
+    # The slow worker has nothing cached locally: only the script can refuse this
+    assert slow.put_session_state(1, state(warnings=2)) == state("terminated", 3)
+    assert slow.cached_session(1) == state("terminated", 3)
+    assert SessionStateCache(redis_url="redis://test").fetch_session(1) == state("terminated", 3)
+
+
+def test_redis_rejects_fewer_warnings(shared_redis):
+    first = SessionStateCache(redis_url="redis://test")
+    second = SessionStateCache(redis_url="redis://test")
+
+    first.put_session_state(1, state(warnings=2))
+
+    assert second.put_session_state(1, state(warnings=1)) == state(warnings=2)
+
+
+def test_redis_accepts_progress(shared_redis):
+    first = SessionStateCache(redis_url="redis://test")
+    second = SessionStateCache(redis_url="redis://test")
+
+    first.put_session_state(1, state(warnings=1))
+
+    assert second.put_session_state(1, state(warnings=2)) == state(warnings=2)
+    assert SessionStateCache(redis_url="redis://test").fetch_session(1) == state(warnings=2)
+
+
+def test_load_session_falls_back_to_the_database(db):
+    db.add(models.ExamSession(id=7, user_id=3, exam_id=4, status="active", warning_count=1))
+    db.commit()
+
+    cache = SessionStateCache()
+
+    assert cache.load_session(db, 7) == {"user_id": 3, "exam_id": 4, "status": "active", "warnings": 1}
+    assert cache.load_session(db, 8) is None
+    assert cache.cached_session(7)["warnings"] == 1
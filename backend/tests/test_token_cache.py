@@ -0,0 +1,55 @@
+from auth import TokenCache
+
+
+def test_returns_live_entries_and_drops_expired_ones():
+    cache = TokenCache(max_entries=10)
+    cache.put("a", {"id": 1}, expires_at=100, now=0)
+
+    assert cache.get("a", now=50) == {"id": 1}
+    assert cache.get("a", now=100) is None
+    assert cache.get("a", now=50) is None
+
+
+def test_full_cache_evicts_expired_entries_before_live_ones():
+    cache = TokenCache(max_entries=3)
+    cache.put("old", 1, expires_at=10, now=0)
+    cache.put("b", 2, expires_at=100, now=0)
+    cache.put("c", 3, expires_at=100, now=0)
+
+    # "old" is the most recently used, but it has expired
+    cache.get("old", now=5)
+    cache.put("d", 4, expires_at=100, now=20)
+
+    assert cache.get("old", now=20) is None
+    assert [cache.get(k, now=20) for k in "bcd"] == [2, 3, 4]
+
+
+def test_full_cache_without_expired_entries_evicts_least_recently_used():
+    cache = TokenCache(max_entries=3)
+    for i, key in enumerate("abc"):
+        cache.put(key, i, expires_at=100, now=0)
+
+    cache.get("a", now=1)
+    cache.put("d", 3, expires_at=100, now=1)
+
+    assert cache.get("b", now=1) is None
+    assert [cache.get(k, now=1) for k in "acd"] == [0, 2, 3]
+
+
+def test_re_put_token_keeps_its_new_expiry():
+    cache = TokenCache(max_entries=3)
+    cache.put("a", 1, expires_at=10, now=0)
+    cache.put("a", 1, expires_at=100, now=5)
+
+    # The heap still holds the old expiry for "a"; it must not evict the entry
+    cache.put("b", 2, expires_at=100, now=20)
+
+    assert cache.get("a", now=20) == 1
+
+
+def test_heap_stays_bounded_under_churn():
+    cache = TokenCache(max_entries=10)
+    for i in range(1000):
+        cache.put(i % 3, i, expires_at=10_000 + i, now=0)
+
+    assert len(cache._expiry) <= 2 * cache.max_entries + 1
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+import schemas
+from live_events import EventBus
+from routers import session as sessions_router
+from session_state import SessionStateCache
+
+STARTED = datetime(2026, 1, 1, 9, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    # Session ids repeat across test databases; keep module caches per test
+    monkeypatch.setattr(sessions_router, "session_states", SessionStateCache())
+    monkeypatch.setattr(sessions_router, "event_bus", EventBus())
+
+
+@pytest.fixture
+def exam_session(db):
+    session = models.ExamSession(user_id=1, exam_id=1, status="active", warning_count=0)
+    db.add(session)
+    db.commit()
+    return session.id
+
+
+def report(db, *violations):
+    batch = schemas.ViolationBatch(violations=[
+        schemas.ViolationReport(**{
+            "violation_type": "no_face",
+            "severity": "LOW",
+            "confidence": 0.9,
+            **v
+        })
+        for v in violations
+    ])
+    return sessions_router.report_violations_bulk(batch, db)
+
+
+def stored(db):
+    db.expire_all()
+    return db.query(models.Violation).order_by(models.Violation.id).all()
+
+
+def test_retried_keys_are_stored_once(db, exam_session):
+    first = report(db, {"session_id": exam_session, "idempotency_key": "a"})
+    retry = report(
+        db,
+        {"session_id": exam_session, "idempotency_key": "a"},
+        {"session_id": exam_session, "idempotency_key": "b"},
+        {"session_id": exam_session, "idempotency_key": "b"}
+    )
+
+    assert first["stored"] == 1
+    assert retry["stored"] == 1
+    assert [v.idempotency_key for v in stored(db)] == ["a", "b"]
+    # Only new violations count towards warnings
+    assert db.get(models.ExamSession, exam_session).warning_count == 2
+    assert [r["warnings"] for r in retry["results"]] == [1, 2, 2]
+
+
+def test_unknown_session_is_reported_per_record(db, exam_session):
+    result = report(
+        db,
+        {"session_id": 999, "idempotency_key": "x"},
+        {"session_id": exam_session, "idempotency_key": "y"}
+    )
+
+    assert result["stored"] == 1
+    assert result["results"][0]["error"] == "Session not found"
+    assert result["results"][1]["warnings"] == 1
+
+
+def test_episode_end_in_the_same_batch(db, exam_session):
+    ended = STARTED + timedelta(seconds=30)
+
+    report(
+        db,
+        {"session_id": exam_session, "idempotency_key": "ep", "detected_at": STARTED,
+         "evidence_url": "/evidence/a.jpg"},
+        {"session_id": exam_session, "idempotency_key": "ep", "detected_at": STARTED, "ended_at": ended}
+    )
+
+    (violation,) = stored(db)
+    assert violation.ended_at == ended
+    assert violation.evidence_url == "/evidence/a.jpg"
+    assert db.get(models.ExamSession, exam_session).warning_count == 1
+
+
+def test_episode_end_in_a_later_batch(db, exam_session):
+    ended = STARTED + timedelta(seconds=30)
+
+    report(db, {"session_id": exam_session, "idempotency_key": "ep", "detected_at": STARTED,
+                "evidence_url": "/evidence/a.jpg"})
+    assert stored(db)[0].ended_at is None
+
+    result = report(db, {"session_id": exam_session, "idempotency_key": "ep",
+                         "detected_at": STARTED, "ended_at": ended})
+
+    (violation,) = stored(db)
+    assert result["stored"] == 0
+    assert violation.ended_at == ended
+    assert violation.evidence_url == "/evidence/a.jpg"
+    assert db.get(models.ExamSession, exam_session).warning_count == 1
+
+
+def test_high_severity_terminates_and_later_violations_change_nothing(db, exam_session):
+    result = report(
+        db,
+        {"session_id": exam_session, "idempotency_key": "p", "violation_type": "mobile_phone_detected",
+         "severity": "HIGH"},
+        {"session_id": exam_session, "idempotency_key": "q"}
+    )
+
+    assert result["stored"] == 1
+    assert result["results"][0]["status"] == "terminated"
+    assert result["results"][0]["reason"] == "mobile_phone_detected"
+    assert db.get(models.ExamSession, exam_session).warning_count == 0